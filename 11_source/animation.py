@@ -1,107 +1,80 @@
 from manim import *
-import pickle
+import inspect
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import manim
+import manim.renderer.cairo_renderer as cairo_renderer
+import common.text_cache as text_cache
+import common.hexvalue as hexvalue
+from common.cache import cache_dir, content_key
+from common.mobject_store import save_vmobjects, load_vmobjects
+import common.components as components
+from common.components import create_logic_unit, create_alu, create_mux
+from common.text_cache import cached_text
+from common.hexvalue import HexValue
+from tracefile import load_trace
+from decode import activation_bits, classify, register_state, memory_addresses, CLASSES, NETLIST
+from profiling import Profiler
+from router import cached_route_all
+from netlist import wires_of
+from compress import plan, PLAY
+from disasm import disassemble_column
+import panels
+from panels import RegisterPanel, Heatmap, PipelineView, TextLines
+from pipeline import Schedule, EX, MEM, WB
+from traceindex import seek_from_env
+from stats import TraceStats, summary, overlay_lines
 
 ACCENT_P = ManimColor("#F7A5A5")
 ACCENT_Y = ManimColor("#FFDBB6")
 LIGHT = ManimColor("#FFF2EF")
+BACKGROUND = ManimColor("#1A2A4F")  # dark background for contrast
 FONT_NAME = "Menlo"
 
-def create_logic_unit(size: float, position: list, color: ManimColor, inputs: list, outputs: list, clock: bool = False, title: str = "", inverted=False) -> VGroup:
-    """creates a logical unit with I/Os"""
-    
-    if not inverted:
-        w, h = 3*size, 5*size
-    else:
-        h, w = 2*size, 5*size
-
-    box = RoundedRectangle(width=w, height=h, color=color,
-                    fill_color=color, fill_opacity=0.2, stroke_width=1.5, corner_radius=w*0.1)
-
-    vg = VGroup()
-    vg.add(box)
-
-    n_in, n_out = len(inputs), len(outputs)
-
-    for i, input in enumerate(inputs):
-        text = Text(input, font_size=8, color=ManimColor("#FFF2EF"))
-        text.next_to(box, LEFT, buff=-(text.width+0.1))
-        text.shift([0, (h/2)-((i+1)*(h/(n_in+1))), 0])
-        vg.add(text)
-
-    for i, output in enumerate(outputs):
-        text = Text(output, font_size=8, color=ManimColor("#FFF2EF"))
-        text.next_to(box, RIGHT, buff=-(text.width+0.1))
-        text.shift([0, (h/2)-((i+1)*(h/(n_out+1))), 0])
-        vg.add(text)
-
-    if clock:
-        text = Text("clock", font_size=8, color=ManimColor("#FFF2EF"))
-        text.shift([-text.width/2, 0, 0])
-        text.next_to(box, UP, buff=-(text.height+0.1))
-        vg.add(text)
-
-    if not title == "":
-        text = Text(title, font_size=8, color=ManimColor("#FFF2EF"))
-        text.next_to(box, DOWN)
-        text.shift([0, 0.5, 0])
-        vg.add(text)
-
-    vg.move_to(position)
-
-    return vg
-
-def create_alu(size: float, position: list, color: ManimColor, title :str = "") -> VGroup:
-    """creates a logical unit with I/Os"""
-
-    # Define the points in the same order as your lines
-    points = [
-        [0, 0, 0],
-        [0, -0.4 * size, 0],
-        [0.1 * size, -0.5 * size, 0],
-        [0, -0.6 * size, 0],
-        [0, -1 * size, 0],
-        [0.35 * size, -0.8 * size, 0],
-        [0.35 * size, -0.2 * size, 0],
-        [0, 0, 0],  # close the polygon
-    ]
-
-    alu = Polygon(*points, color=color, fill_opacity=0.2, fill_color=color, stroke_width=1.5)
-    vg = VGroup(alu)
-
-    title_text = Text(title, font_size=size*12)
-
-    # Center the text inside the polygon
-    title_text.move_to(alu.get_center()+[0.025*size,0,0])
-    title_text.rotate(PI / 2)
-    vg.add(title_text)
-
-    vg.move_to(position)
-
-    return vg
-
-def create_mux(position: list, color: ManimColor, size: float = 1.0) -> VGroup:
-    points = [
-        [-0.25, 0.4, 0],
-        [0.0, 0.25, 0],
-        [0.0, -0.25, 0],
-        [-0.25, -0.4, 0],
-    ]
-    scaled_points = [[x * size, y * size, z * size] for x, y, z in points]
-    mux_shape = Polygon(
-        *scaled_points,
-        fill_color=color,
-        fill_opacity=0.2,
-        color=color,
-        stroke_width=1.5
-    ).shift(position)
-    mux_label = Text("MUX", font_size=8 * size).rotate(PI / 2)
-    mux_label.move_to(mux_shape.get_center())
-    mux = VGroup(mux_shape, mux_label)
-    return mux
-
 from manim import *
 import numpy as np
 
+def point_on_edge(vgroup, edge_dir, pos):
+    rect = vgroup[0]  # assume first element is the main shape
+    w, h = rect.width / 2, rect.height / 2
+    cx, cy, cz = rect.get_center()
+    if np.allclose(edge_dir, LEFT):
+        return np.array([cx - w, cy + h * (0.5 - pos), cz])
+    elif np.allclose(edge_dir, RIGHT):
+        return np.array([cx + w, cy + h * (0.5 - pos), cz])
+    elif np.allclose(edge_dir, UP):
+        return np.array([cx - w * (0.5 - pos), cy + h, cz])
+    elif np.allclose(edge_dir, DOWN):
+        return np.array([cx - w * (0.5 - pos), cy - h, cz])
+    else:
+        return vgroup.get_center()
+
+def unit_box(vgroup) -> tuple:
+    """(x0, y0, x1, y1) of a unit's main shape, what the router has to go around"""
+    rect = vgroup[0]
+    (x0, y0, _), (x1, y1, _) = rect.get_corner(DL), rect.get_corner(UR)
+    return (x0, y0, x1, y1)
+
+def wire_pins(src: VGroup, dst: VGroup, offset_src=RIGHT, offset_dst=LEFT, pos_src=0.5, pos_dst=0.5, hgap=0.3):
+    """start, end, and the two points `hgap` away from the units every wire goes through"""
+    start = point_on_edge(src, offset_src, pos_src)
+    end = point_on_edge(dst, offset_dst, pos_dst)
+    step1 = start + normalize(offset_src) * hgap
+    step_last = end + normalize(offset_dst) * hgap
+    return start, step1, step_last, end
+
+def make_wire(scene, points, color=LIGHT, stroke_width=1.5) -> VMobject:
+    # Create the VMobject wire
+    wire = VMobject()
+    wire.set_points_as_corners(points)
+    wire.set_stroke(color=color, width=stroke_width)
+
+    scene.add(wire)
+    return wire
+
 def connect(
     scene,
     src: VGroup,
@@ -120,28 +93,7 @@ def connect(
     Always goes vertically first (up/down) before horizontal.
     """
 
-    def point_on_edge(vgroup, edge_dir, pos):
-        rect = vgroup[0]  # assume first element is the main shape
-        w, h = rect.width / 2, rect.height / 2
-        cx, cy, cz = rect.get_center()
-        if np.allclose(edge_dir, LEFT):
-            return np.array([cx - w, cy + h * (0.5 - pos), cz])
-        elif np.allclose(edge_dir, RIGHT):
-            return np.array([cx + w, cy + h * (0.5 - pos), cz])
-        elif np.allclose(edge_dir, UP):
-            return np.array([cx - w * (0.5 - pos), cy + h, cz])
-        elif np.allclose(edge_dir, DOWN):
-            return np.array([cx - w * (0.5 - pos), cy - h, cz])
-        else:
-            return vgroup.get_center()
-
-    start = point_on_edge(src, offset_src, pos_src)
-    end = point_on_edge(dst, offset_dst, pos_dst)
-
-    dir_src = normalize(offset_src)
-    step1 = start + dir_src * hgap
-    dir_dst = normalize(offset_dst)
-    step_last = end + dir_dst * hgap
+    start, step1, step_last, end = wire_pins(src, dst, offset_src, offset_dst, pos_src, pos_dst, hgap)
 
     # List of intermediate waypoints (optional)
     stops = [step1]
@@ -162,31 +114,177 @@ def connect(
     mid_to_end = np.array([points[-1][0], end[1], 0])
     points.extend([mid_to_end, end])
 
-    # Create the VMobject wire
-    wire = VMobject()
-    wire.set_points_as_corners(points)
-    wire.set_stroke(color=color, width=stroke_width)
-
-    scene.add(wire)
-    return wire
+    return make_wire(scene, points, color=color, stroke_width=stroke_width)
 
-def pulse_wire(scene, wire: VMobject, color=ACCENT_Y, duration=0.15):
-    """Return animations for a glowing pulse that fades out."""
-    pulse = wire.copy()
-    pulse.set_stroke(color=color, width=4, opacity=1.0)
-    # DO NOT add pulse to scene manually
-
-    anim_create = Create(pulse, rate_func=linear, run_time=duration)
-    anim_fade = FadeOut(pulse, run_time=0.4)
+class WirePulse(Animation):
+    """
+    Glowing pulse that runs along a wire then fades out.
+    Built once per wire and replayed every cycle: the highlight mobject is
+    re-cut from the wire at each frame, nothing gets copied or allocated.
+    """
 
-    # Return as a sequential animation
-    return Succession(anim_create, anim_fade)
+    def __init__(self, wire: VMobject, color=ACCENT_Y, duration=0.15, fade=0.4, **kwargs):
+        self.wire = wire
+        self.draw_fraction = duration / (duration + fade)
+        self.drawn = False
+        pulse = wire.copy().set_stroke(color=color, width=4, opacity=0.0)
+        # remover: the pulse leaves the scene between cycles, play() adds it back
+        super().__init__(pulse, run_time=duration + fade, rate_func=linear, remover=True, **kwargs)
+
+    def create_starting_mobject(self):
+        # the wire itself is the reference, no need for a copy
+        return self.wire
+
+    def interpolate_mobject(self, alpha: float):
+        self.set_progress(self.rate_func(alpha))
+
+    def set_progress(self, alpha: float):
+        """draws the pulse as it is `alpha` of the way through (also used by the timeline playback)"""
+        if alpha < self.draw_fraction:
+            self.mobject.pointwise_become_partial(self.wire, 0, alpha / self.draw_fraction)
+            self.drawn = False
+            opacity = 1.0
+        else:
+            if not self.drawn:
+                self.mobject.pointwise_become_partial(self.wire, 0, 1)
+                self.drawn = True
+            opacity = 1.0 - smooth((alpha - self.draw_fraction) / (1 - self.draw_fraction))
+        self.mobject.set_stroke(opacity=opacity)
+
+    def hide(self):
+        self.mobject.set_stroke(opacity=0.0)
+
+
+class PulsePool:
+    """one reusable WirePulse per wire"""
+
+    def __init__(self, wires: list, color=ACCENT_Y, duration=0.15):
+        self.pulses = [WirePulse(w, color=color, duration=duration) for w in wires]
+
+    def __getitem__(self, idx) -> WirePulse:
+        return self.pulses[idx]
+
+    def trigger(self, mask) -> list:
+        """pulses of every wire set in an activation mask"""
+        return [self.pulses[w] for w in wires_of(mask)]
+
+
+# units, wires and the wires of every instruction class : netlist.json, see netlist.py
+BUILDERS = {"logic_unit": create_logic_unit, "alu": create_alu, "mux": create_mux}
+DIRECTIONS = {"RIGHT": RIGHT, "LEFT": LEFT, "UP": UP, "DOWN": DOWN}
+
+
+def build_unit(spec: dict) -> VGroup:
+    kwargs = {k: v for k, v in spec.items() if k != "builder"}
+    if spec["builder"] == "logic_unit":
+        kwargs.setdefault("inputs", [])
+        kwargs.setdefault("outputs", [])
+    return BUILDERS[spec["builder"]](color=ACCENT_Y, **kwargs)
+
+
+def wire_options(wire: dict) -> dict:
+    """connect() options of a netlist wire, edges named by direction ("RIGHT" ...)"""
+    options = {k: v for k, v in wire.items() if k not in ("name", "src", "dst")}
+    for k in ("offset_src", "offset_dst"):
+        if k in options:
+            options[k] = DIRECTIONS[options[k]]
+    return options
+
+
+UNITS = NETLIST.units
+WIRES = [(wire["name"], wire["src"], wire["dst"], wire_options(wire)) for wire in NETLIST.wires]
+# BRH_ROUTER=auto ignores the hand tuned waypoints and routes every wire with router.py
+ROUTER = os.environ.get("BRH_ROUTER", "manual")
+# BRH_LAYOUT_CACHE=0 rebuilds the static datapath on every render
+LAYOUT_CACHE = os.environ.get("BRH_LAYOUT_CACHE", "1") != "0"
+
+
+def layout_key() -> str:
+    """hash of everything the static datapath is built from, including the builders' code"""
+    builders = (components, connect, wire_pins, make_wire, cached_route_all, build_unit, wire_options)
+    return content_key(manim.__version__, NETLIST.units, NETLIST.wires, ROUTER,
+                       [inspect.getsource(f) for f in builders])
+
+# trace column -> (unit it sits next to, offset from that unit's right edge, rotation, aligned edge)
+LABELS = {
+    "pc": ("pc", [0.4, 0.3, 0], 0, ORIGIN),
+    "instr": ("I$", [0.65, 0.1, 0], 0, UP),
+    "R1": ("regfile", [0.7, 1.45, 0], 0, ORIGIN),
+    "R2": ("regfile", [0.2, -0.3, 0], PI/2, ORIGIN),
+    "imm": ("imm", [0.3, -0.1, 0], 0, ORIGIN),
+    "mem": ("D$", [0.3, 0.1, 0], 0, ORIGIN),
+    "wb": ("wb", [0.2, -0.3, 0], PI/2, ORIGIN),
+    # not a trace column: the disassembled instruction, shown above I$ with BRH_MNEMONICS=1
+    "asm": ("I$", [-0.45, 0.9, 0], 0, DOWN),
+}
+FONT_SIZE = 8
+
+TRACE_PATH = os.environ.get("BRH_TRACE", "trace_data.pkl")
+MAX_CYCLES = int(os.environ.get("BRH_MAX_CYCLES", 300))
+# cycle window [start, end), the labels start on row start-1, or start-STRIDE for a chunk
+# of a strided render (see render_parallel.py).
+# Without an end, MAX_CYCLES rows from the start. BRH_SEEK_PC / BRH_SEEK_OPCODE move
+# the start to the first matching cycle (see traceindex.py)
+CYCLE_START = int(os.environ.get("BRH_CYCLE_START", 1))
+CYCLE_END = int(os.environ.get("BRH_CYCLE_END", 0)) or None
+# plays every STRIDE-th cycle of the window
+STRIDE = max(1, int(os.environ.get("BRH_STRIDE", 1)))
+# 0 plays every cycle, N keeps N iterations of every loop and fast forwards the rest (see compress.py)
+TIMELAPSE = int(os.environ.get("BRH_TIMELAPSE", 0))
+# "play": one self.play per cycle, "timeline": a single animation driven by a cycle ValueTracker
+PLAYBACK = os.environ.get("BRH_PLAYBACK", "play")
+MNEMONICS = os.environ.get("BRH_MNEMONICS", "0") != "0"
+# panel of the 32 registers, rebuilt from the wb column and rd
+REGISTERS = os.environ.get("BRH_REGISTERS", "0") != "0"
+# five-stage pipeline playback, one step per pipeline cycle (see pipeline.py)
+PIPELINE = os.environ.get("BRH_PIPELINE", "0") != "0"
+# instruction mix / CPI overlay in the top right corner (see stats.py)
+STATS = os.environ.get("BRH_STATS", "0") != "0"
+# N > 0: heatmap of the data memory accesses above D$, redrawn every N cycles
+HEATMAP = int(os.environ.get("BRH_HEATMAP", 0))
+# "start,end" of the whole render when this process only renders a chunk of it (render_parallel.py):
+# the heatmap and the statistics count from its start, like a single process render would
+RENDER_RANGE = os.environ.get("BRH_RENDER_RANGE")
+
+PLAY_TIME, WAIT_TIME = 0.2, 0.05  # per cycle
+
+
+# BRH_PROFILE=1 times the hot paths per cycle / opcode class, see profiling.py
+PROFILER = Profiler.from_env()
+if PROFILER.enabled:
+    PROFILER.wrap(text_cache, "_build", "text.layout")
+    PROFILER.wrap(Transform, "interpolate_mobject", "transform.interpolate")
+    PROFILER.wrap(WirePulse, "set_progress", "pulse.draw")
+    PROFILER.wrap(Camera, "capture_mobjects", "frame.rasterize")
+    PROFILER.wrap(SceneFileWriter, "write_frame", "frame.write")
+
+
+# manim hashes every mobject of the scene for each play/wait to find its partial movie.
+# The per-cycle segments are keyed on the trace rows they show instead (see cycle_key),
+# so a re-generated trace only re-renders the cycles whose rows changed
+SEGMENT_KEYS = os.environ.get("BRH_SEGMENT_KEYS", "1") != "0"
+_manim_hash = cairo_renderer.get_hash_from_play_call
+
+
+def segment_hash(scene, camera, animations, mobjects, **kwargs) -> str:
+    key = getattr(scene, "segment_key", None)
+    if key is None:
+        return _manim_hash(scene, camera, animations, mobjects, **kwargs)
+    return content_key(key, camera.pixel_width, camera.pixel_height, config.frame_rate,
+                       kwargs["backend"], kwargs["encoder_fingerprint"])
+
+
+if SEGMENT_KEYS:
+    cairo_renderer.get_hash_from_play_call = segment_hash
+
+
+def fmt(x) -> str:
+    return f"0x{int(x) & 0xFFFFFFFF:08X}"
 
 
 class Animation(Scene):
     def construct(self):
-        self.camera.background_color = "#1A2A4F"  # dark background for contrast
-        DEFAULT_SIZE = 0.3
+        self.camera.background_color = BACKGROUND
 
         # watermark = Text(
         #     "HOLY CORE ♰", 
@@ -197,157 +295,371 @@ class Animation(Scene):
 
         # self.add(watermark)
 
-        # approximate placement
-        units = {
-            "pc_mux": create_mux([-5.5, 0, 0], ACCENT_Y, size=1.3),
-            "pc": create_logic_unit(0.15, [-4.5, 0, 0], ACCENT_Y, [], [], title="PC"),
-
-            "I$": create_logic_unit(DEFAULT_SIZE, [-3, 0.2, 0], ACCENT_Y, [], [], title="I$"),
-            "pc_adder": create_alu(1, [-3, -1.5, 0], ACCENT_Y, title="+"),
-            "4": create_logic_unit(0.1, [-3.8, -1.75, 0], ACCENT_Y,[], [],  title="0x4", inverted=False),
-
-            "control": create_logic_unit(DEFAULT_SIZE, [-1, 2, 0], ACCENT_Y, [], [], title="Control"),
-            "regfile": create_logic_unit(DEFAULT_SIZE, [-1, 0, 0], ACCENT_Y, [], [], title="RegFile"),
-            "imm": create_logic_unit(0.2, [-1, -2, 0], ACCENT_Y, [], [], title="Imm", inverted=True),
-            
-            "alu_mux": create_mux([0.5,0.1,0], ACCENT_Y, size=1),
-            "adder_mux": create_mux([0.5,-1.1,0], ACCENT_Y, size=1),
-
-            "alu": create_alu(2, [1.7, 0.85, 0], ACCENT_Y, title="ALU"),
-            "adder": create_alu(1.5, [1.7, -1.5, 0], ACCENT_Y, title="+"),
-
-            "D$": create_logic_unit(DEFAULT_SIZE, [3.5, 0, 0], ACCENT_Y, [], [], title="D$"),
-            "wb": create_mux([5.5,0,0], ACCENT_Y, size=2)
+        self.build_datapath()
+
+        start, stop = self.load_window(CYCLE_START, CYCLE_END)
+        self.pulses = PulsePool(self.wires)
+
+        # what the segments show besides the trace rows (see cycle_key)
+        self.segment_key = None
+        # + the code drawing the labels and panels
+        self.scene_key = content_key(layout_key(), Path(__file__).read_text(),
+                                     [inspect.getsource(m) for m in (text_cache, hexvalue, panels)],
+                                     MNEMONICS, REGISTERS, HEATMAP, PIPELINE, STATS)
+
+        # the scene state at any cycle is fully given by the previous trace row
+        self.setup_labels(self.base)
+        if REGISTERS:
+            self.setup_registers(self.base)
+        if HEATMAP:
+            self.setup_heatmap(self.base)
+        if STATS:
+            self.setup_stats(self.base)
+        self.play_cycles(start, stop)
+        PROFILER.report({f"text_cache.{k}": v for k, v in text_cache.stats.items()})
+
+    def load_window(self, start: int, stop: int = None) -> tuple:
+        """
+        loads the trace and decodes the cycles [start, stop), clamped to the trace.
+        `start` moves to the seek target if any, `stop` defaults to MAX_CYCLES rows later
+        """
+        # Load the trace (legacy pickle or columnar .trace, see tracefile.py)
+        self.data = load_trace(TRACE_PATH)
+        start = seek_from_env(self.data, max(1, start))
+        stop = min(stop or start - 1 + MAX_CYCLES, len(self.data))
+
+        first, last = map(int, RENDER_RANGE.split(",")) if RENDER_RANGE else (start, stop)
+        self.range_base, self.range_stop = first - 1, last
+
+        # decode the whole rendered window at once, one row per cycle. The labels start on the
+        # row shown before `start`: the previous played cycle inside a strided render
+        self.base = start - STRIDE if start > first else start - 1
+        self.active = activation_bits(self.data["instr"][self.base:stop])
+        self.op_class = classify(self.data["instr"][self.base:stop])
+        if MNEMONICS:
+            # one formatted string per distinct instruction word, see disasm.py
+            self.asm_table, self.asm_index = disassemble_column(self.data["instr"][self.base:stop])
+        return start, stop
+
+    def build_datapath(self):
+        """adds the units and wires, reloading them from the layout cache when nothing changed"""
+        key = layout_key()
+        path = cache_dir("layout") / f"{key}.npz"
+        if LAYOUT_CACHE and path.exists():
+            mobjects = load_vmobjects(path)
+            units = {name: mobjects[f"unit:{name}"] for name in UNITS}
+            wires = {name: mobjects[f"wire:{name}"] for name, *_ in WIRES}
+        else:
+            units = {name: build_unit(spec) for name, spec in UNITS.items()}
+            wires = self.route_wires(units) if ROUTER == "auto" else self.connect_wires(units)
+            if LAYOUT_CACHE:
+                save_vmobjects(path, {**{f"unit:{k}": v for k, v in units.items()},
+                                      **{f"wire:{k}": v for k, v in wires.items()}})
+
+        self.units = units
+        self.add(*units.values(), *wires.values())
+        # bit k of the activation masks is the k-th wire of the netlist
+        self.wires = [wires[name] for name, *_ in WIRES]
+
+    def connect_wires(self, units: dict) -> dict:
+        return {
+            name: connect(self, units[src], units[dst], color=ACCENT_P, **options)
+            for name, src, dst, options in WIRES
         }
 
-        for unit in units.values():
-            self.add(unit)
-
-        # Example interconnections (customize as needed)
-        w1 = connect(self, units["adder"], units["pc_mux"], color=ACCENT_P, waypoints=[(-6.5,-2.7)], pos_dst=.45)
-        w2 = connect(self, units["pc_adder"], units["pc_mux"], color=ACCENT_P, waypoints=[(-6.3,-2.5)], pos_dst=0.9)
-        w25 = connect(self, units["wb"], units["pc_mux"], color=ACCENT_P, waypoints=[(-6.7,-3)], pos_dst=0.)
-        w3 = connect(self, units["pc_mux"], units["pc"], color=ACCENT_P)
-
-        w4 = connect(self, units["pc"], units["I$"], color=ACCENT_P)
-        w5 = connect(self, units["pc"], units["pc_adder"], color=ACCENT_P, pos_dst=0)
-        w6 = connect(self, units["4"], units["pc_adder"], color=ACCENT_P, pos_dst=1)
-
-        w7 = connect(self, units["I$"], units["control"], color=ACCENT_P)
-        w8 = connect(self, units["I$"], units["regfile"], color=ACCENT_P, pos_dst=0)
-        w9 = connect(self, units["I$"], units["imm"], color=ACCENT_P)
-
-        w10 = connect(self, units["imm"], units["alu_mux"], color=ACCENT_P, pos_dst=1, waypoints=[(-0.05,-2)])
-
-        w11 = connect(self, units["regfile"], units["alu_mux"], color=ACCENT_P, pos_dst=0, waypoints=[])
-    
-        w12 = connect(self, units["pc"], units["adder_mux"], color=ACCENT_P, pos_dst=1, waypoints=[(-2,-0.8)])
-        w13 = connect(self, units["regfile"], units["adder_mux"], color=ACCENT_P, pos_dst=0, waypoints=[])
-        w14 = connect(self, units["regfile"], units["adder_mux"], color=ACCENT_P, pos_dst=0, waypoints=[])
-        
-        w15 = connect(self, units["regfile"], units["alu"], color=ACCENT_P, pos_dst=0, pos_src=-0.2)
-        w16 = connect(self, units["alu_mux"], units["alu"], color=ACCENT_P, pos_dst=1.1)
-
-        w17 = connect(self, units["imm"], units["adder"], color=ACCENT_P, pos_dst=1.1,waypoints=[(-0.05,-2)])
-        w18 = connect(self, units["adder_mux"], units["adder"], color=ACCENT_P, pos_dst=0)
-
-        w19 = connect(self, units["alu"], units["D$"], color=ACCENT_P, pos_dst=0)
-        w24 = connect(self, units["regfile"], units["D$"], color=ACCENT_P, pos_dst=1)
-
-        w20 = connect(self, units["alu"], units["wb"], color=ACCENT_P, waypoints=[(4.5,1)], pos_dst=0)
-        w21 = connect(self, units["D$"], units["wb"], color=ACCENT_P)
-        w22 = connect(self, units["adder"], units["wb"], color=ACCENT_P, pos_dst=1, waypoints=[(4.5,-1.5)])
-
-        w23 = connect(self, units["wb"], units["regfile"], color=ACCENT_P, pos_dst=1, waypoints=[(5.5,-3),(-1.75,-3)])
-
-        # Load the trace
-        with open("trace_data.pkl", "rb") as f:
-            data = pickle.load(f)
-
-        FONT_SIZE = 8
-        fmt = lambda x: f"0x{x & 0xFFFFFFFF:08X}"
-
-        # Create the initial text labels at their locations
-        pc_text = Text(fmt(data["pc"][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["pc"].get_right() + [0.4, 0.3,0])
-        instr_text = Text(fmt(data["instr"][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["I$"].get_right() + [0.65,0.1,0], UP)
-        r1_text = Text(fmt(data['R1'][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["regfile"].get_right() + [0.7,1.45,0])
-        r2_text = Text(fmt(data['R2'][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["regfile"].get_right() + [0.2, -0.3,0]).rotate(PI/2)
-        imm_text = Text(fmt(data["imm"][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["imm"].get_right() + [0.3,-0.1,0])
-        mem_text = Text(fmt(data["mem"][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["D$"].get_right()+ [0.3, 0.1,0])
-        wb_text = Text(fmt(data["wb"][0]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(units["wb"].get_right() + [0.2, -0.3,0]).rotate(PI/2)
-
-        self.add(pc_text, instr_text, r1_text, r2_text, imm_text, mem_text, wb_text)
-
-        # Update the values every second
-        for i in range(1, min(300, len(data["pc"]))):
-            new_pc = Text(fmt(data["pc"][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(pc_text.get_center())
-            new_instr = Text(fmt(data["instr"][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(instr_text.get_center())
-            new_r1 = Text(fmt(data['R1'][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(r1_text.get_center())
-            new_r2 = Text(fmt(data['R2'][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(r2_text.get_center()).rotate(PI/2)
-            new_imm = Text(fmt(data["imm"][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(imm_text.get_center())
-            new_mem = Text(fmt(data["mem"][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(mem_text.get_center())
-            new_wb = Text(fmt(data["wb"][i]), font_size=FONT_SIZE, color=ManimColor("#FFF2EF"), font=FONT_NAME).move_to(wb_text.get_center()).rotate(PI/2)
-
-            OP_CODE = int(data["instr"][i]) & 0x7F
-
-            # --- RISC-V 32I Opcode Map ---
-            # (Base subset only, for clarity)
-            # 0x33 -> R-type (ALU register)
-            # 0x13 -> I-type (ALU immediate)
-            # 0x03 -> Load
-            # 0x23 -> Store
-            # 0x63 -> Branch
-            # 0x37 -> LUI
-            # 0x17 -> AUIPC
-            # 0x6F -> JAL
-            # 0x67 -> JALR
-
-            # We'll pulse the wires that roughly correspond to the datapath usage
-            # You can fine-tune which wires get pulsed based on your visual layout.
-
-            # --- Update OPCODE pulse block ---
-            if OP_CODE == 0x33:  # R-type
-                anims = [pulse_wire(self, w) for w in [w8, w4, w15, w7, w6, w2,w5, w3, w11, w16, w20, w23]]
-
-            elif OP_CODE == 0x13:  # I-type
-                anims = [pulse_wire(self, w) for w in [w8,w4, w15, w7, w6, w2,w5, w3, w10, w16, w20, w23]]
-
-            elif OP_CODE == 0x03:  # LOAD
-                anims = [pulse_wire(self, w) for w in [w8,w4, w15, w7, w6, w2,w5, w3 ,w9, w19, w21, w23, w24]]
-
-            elif OP_CODE == 0x23:  # STORE
-                anims = [pulse_wire(self, w) for w in [w8, w4, w15, w7, w6, w2,w5, w3, w10, w16, w19]]
-
-            elif OP_CODE == 0x63:  # BRANCH
-                anims = [pulse_wire(self, w) for w in [w8, w4, w7, w12, w17,w9, w18, w1, w3]]
-
-            elif OP_CODE == 0x6F:  # JAL
-                anims = [pulse_wire(self, w) for w in [w4, w7, w17, w9, w18,w1, w22, w23]]
-
-            elif OP_CODE == 0x67:  # JALR
-                anims = [pulse_wire(self, w) for w in [w8, w4, w7, w10, w1, w3, w25]]
-
-            elif OP_CODE == 0x37:  # LUI
-                anims = [pulse_wire(self, w) for w in [w4, w7, w6, w2,w5, w3, w10, w20, w23]]
-
-            elif OP_CODE == 0x17:  # AUIPC
-                anims = [pulse_wire(self, w) for w in [w4, w7, w6, w2,w5, w3, w12, w17,w9, w22, w23]]
-
-            else:  # unknown opcode
-                anims = [pulse_wire(self, w4)]
-
-            self.play(
-                Transform(pc_text, new_pc),
-                Transform(instr_text, new_instr),
-                Transform(r1_text, new_r1),
-                Transform(r2_text, new_r2),
-                Transform(imm_text, new_imm),
-                Transform(mem_text, new_mem),
-                Transform(wb_text, new_wb),
-                AnimationGroup(*anims),
-                run_time=0.2,  # match pulse duration
-                rate_func=linear
-            )
-
-            # short delay before next instruction
-            self.wait(0.05)
\ No newline at end of file
+    def route_wires(self, units: dict) -> dict:
+        """routes all the wires at once around the units (cached by layout, see router.py)"""
+        pins = [
+            wire_pins(units[src], units[dst],
+                      **{k: v for k, v in options.items() if k != "waypoints"})
+            for _, src, dst, options in WIRES
+        ]
+        obstacles = [unit_box(unit) for unit in units.values()]
+        routes = cached_route_all(obstacles, pins)
+        return {name: make_wire(self, points, color=ACCENT_P) for (name, *_), points in zip(WIRES, routes)}
+
+    def label_string(self, column: str, cycle: int) -> str:
+        if column == "asm":
+            return self.asm_table[self.asm_index[cycle - self.base]]
+        return fmt(self.data[column][cycle])
+
+    def value_text(self, column: str, cycle: int):
+        rotation = LABELS[column][2]
+        return cached_text(self.label_string(column, cycle), font=FONT_NAME, font_size=FONT_SIZE,
+                           color=LIGHT, rotation=rotation)
+
+    def make_label(self, column: str, cycle: int):
+        # hex values swap the glyphs of their changed digits, the mnemonic is a plain text
+        if column == "asm":
+            return self.value_text(column, cycle)
+        return HexValue(self.data[column][cycle], font=FONT_NAME, font_size=FONT_SIZE, color=LIGHT,
+                        rotation=LABELS[column][2])
+
+    def update_label(self, column: str, label, cycle: int, animate: bool = True) -> list:
+        """brings a label to `cycle`: the Transforms to play when animated, else snaps it"""
+        if isinstance(label, HexValue):
+            return label.set_value(self.data[column][cycle], animate)
+        target = self.value_text(column, cycle).move_to(label.get_center())
+        if animate:
+            return [Transform(label, target)]
+        label.become(target)
+        return []
+
+    def setup_labels(self, cycle: int):
+        """creates the value labels at their locations, showing `cycle`"""
+        self.labels = {}
+        for column, (unit, offset, _, edge) in LABELS.items():
+            if column == "asm" and not MNEMONICS:
+                continue
+            label = self.make_label(column, cycle).move_to(self.units[unit].get_right() + offset, edge)
+            self.labels[column] = label
+            self.add(label)
+        self.shown = cycle  # row the labels show
+
+    def setup_registers(self, cycle: int):
+        """creates the register panel above the regfile, showing the registers after row `cycle`"""
+        rows = slice(0, cycle + 1)
+        self.registers = RegisterPanel(register_state(self.data["instr"][rows], self.data["wb"][rows]),
+                                       font=FONT_NAME, font_size=FONT_SIZE, color=LIGHT)
+        self.registers.cycle = cycle
+        self.registers.next_to(self.units["control"], UP, buff=0.25).set_x(self.units["regfile"].get_x())
+        self.add(self.registers)
+
+    def register_target(self, cycle: int) -> np.ndarray:
+        """the registers after row `cycle`, replaying the writes since the row the panel shows"""
+        rows = slice(self.registers.cycle + 1, cycle + 1)
+        return register_state(self.data["instr"][rows], self.data["wb"][rows], self.registers.values)
+
+    def register_updates(self, cycle: int, animate: bool = True) -> list:
+        """brings the register panel to row `cycle`, only the registers written since change"""
+        values = self.register_target(cycle)
+        self.registers.cycle = cycle
+        return self.registers.set_values(values, animate)
+
+    def setup_heatmap(self, cycle: int):
+        """creates the D$ heatmap over the render's address range, showing row `cycle`"""
+        rows = slice(self.range_base, self.range_stop)
+        address, access = memory_addresses(*(self.data[k][rows] for k in ("instr", "R1", "imm", "mem")))
+        lo, hi = (int(address[access].min()), int(address[access].max())) if access.any() else (0, 0)
+        self.heatmap = Heatmap(lo, hi, cold=BACKGROUND, hot=ACCENT_P, font=FONT_NAME, font_size=FONT_SIZE,
+                               color=LIGHT)
+        self.mem_bins = self.heatmap.bins(address, access)
+        self.heatmap.cycle = self.range_base - 1
+        self.update_heatmap(cycle)
+        self.heatmap.next_to(self.units["D$"], UP, buff=0.4)
+        self.add(self.heatmap)
+
+    def update_heatmap(self, cycle: int):
+        """
+        brings the heatmap to row `cycle`. It is redrawn every HEATMAP rows of the render
+        and shows the accesses up to the last of them, whatever rows were played (stride, chunks)
+        """
+        shown = self.range_base + (cycle - self.range_base) // HEATMAP * HEATMAP
+        if shown <= self.heatmap.cycle:
+            return
+        self.heatmap.accumulate(self.mem_bins[self.heatmap.cycle + 1 - self.range_base:shown + 1 - self.range_base])
+        self.heatmap.cycle = shown
+
+    def setup_stats(self, cycle: int):
+        """creates the statistics overlay, counting the render's rows up to `cycle`"""
+        rows = slice(self.range_base, self.range_stop)
+        self.stats = TraceStats(self.data["pc"][rows], self.data["instr"][rows])
+        self.stats_panel = TextLines(self.stats_lines(cycle), font=FONT_NAME, font_size=FONT_SIZE, color=LIGHT)
+        self.stats_panel.to_corner(UR, buff=0.3)
+        self.add(self.stats_panel)
+
+    def stats_lines(self, cycle: int) -> list:
+        """overlay lines of the render's rows up to `cycle`, a lookup in the prefix sums"""
+        return overlay_lines(summary(self.stats.counts(0, cycle + 1 - self.range_base)))
+
+    def jump_to(self, cycle: int):
+        """snaps every label to `cycle` without animating"""
+        for column, label in self.labels.items():
+            self.update_label(column, label, cycle, animate=False)
+        self.shown = cycle
+        if REGISTERS:
+            self.register_updates(cycle, animate=False)
+        if HEATMAP:
+            self.update_heatmap(cycle)
+        if STATS:
+            self.stats_panel.set_lines(self.stats_lines(cycle), animate=False)
+
+    def play_cycles(self, start: int, stop: int):
+        if PIPELINE:
+            self.play_pipeline(start, stop)
+            return
+
+        cycles = np.arange(start, stop, STRIDE)
+        if PLAYBACK == "timeline":
+            self.play_timeline(cycles)
+            return
+
+        if not TIMELAPSE:
+            for i in cycles:
+                self.play_cycle(int(i))
+            return
+
+        # with a stride, loops are looked for in the sampled cycles
+        segments = plan(self.data["pc"][cycles], self.active[cycles - self.base], keep=TIMELAPSE)
+        for kind, first, last, *skipped in segments:
+            if kind == PLAY:
+                for i in cycles[first:last]:
+                    self.play_cycle(int(i))
+            else:
+                self.fast_forward(int(cycles[last - 1]), *skipped)
+
+    def play_cycle(self, i: int):
+        with PROFILER.cycle(i, CLASSES[self.op_class[i - self.base]]):
+            self._play_cycle(i)
+
+    def cycle_key(self, i: int, kind: str) -> str:
+        """
+        content key of a cycle's segment : the play morphs the labels from the row they
+        show (i-1, or i-STRIDE) to row i and pulses row i's wires, the wait shows row i
+        """
+        rows = (self.shown, i) if kind == "play" else (i,)
+        values = [self.label_string(column, row) for row in rows for column in self.labels]
+        active = self.active[i - self.base].tobytes() if kind == "play" else b""
+        # registers as shown when the segment starts, and for the play the ones it morphs to:
+        # with a stride, the rows skipped since the shown one write registers too
+        registers = b""
+        if REGISTERS:
+            registers = self.registers.values.tobytes()
+            if kind == "play":
+                registers += self.register_target(i).tobytes()
+        heatmap = self.heatmap.image.pixel_array.tobytes() if HEATMAP else b""
+        stats = (self.stats_panel.strings, self.stats_lines(i)) if STATS else ()
+        return content_key(self.scene_key, kind, list(self.labels), values, active, registers, heatmap, stats)
+
+    def label_updates(self, i: int) -> list:
+        return [
+            update
+            for column, label in self.labels.items()
+            for update in self.update_label(column, label, i)
+        ]
+
+    def _play_cycle(self, i: int):
+        if HEATMAP:
+            self.update_heatmap(i)
+        self.segment_key = self.cycle_key(i, "play")
+        updates = self.label_updates(i)
+        if REGISTERS:
+            updates += self.register_updates(i)
+        if STATS:
+            updates += self.stats_panel.set_lines(self.stats_lines(i))
+        self.play(
+            *updates,
+            # wires used by this cycle's opcode class (see decode.py)
+            AnimationGroup(*self.pulses.trigger(self.active[i - self.base])),
+            run_time=PLAY_TIME,  # match pulse duration
+            rate_func=linear
+        )
+
+        # short delay before next instruction
+        self.shown = i
+        self.segment_key = self.cycle_key(i, "wait")
+        self.wait(WAIT_TIME)
+        self.segment_key = None
+
+    def play_pipeline(self, start: int, stop: int):
+        """
+        plays rows [start, stop) through a five-stage pipeline, one step per pipeline
+        cycle. The stage slots show the instructions in flight, the datapath labels and
+        wires follow the instruction in EX, registers its writeback in WB
+        """
+        schedule = Schedule(self.data["pc"][start:stop], self.data["instr"][start:stop])
+        self.pipeline = PipelineView(font=FONT_NAME, font_size=FONT_SIZE, color=LIGHT, bubble_color=ACCENT_P)
+        self.pipeline.to_edge(DOWN, buff=0.15)
+        self.add(self.pipeline)
+        # pc is the next pc (see tracefile.py): the address of instruction k is on the row before
+        describe = lambda k: self.label_string("asm", start + k) if MNEMONICS else self.label_string("pc", start + k - 1)
+
+        for t in range(len(schedule)):
+            tokens = schedule.occupancy(t)
+            updates = self.pipeline.set_slots(tokens, describe)
+            # bubbles are tuples, instructions their index in the window
+            ex, mem, wb = (start + tokens[s] if isinstance(tokens[s], int) else None for s in (EX, MEM, WB))
+            if HEATMAP and mem is not None:
+                self.update_heatmap(mem)
+            if REGISTERS and wb is not None:
+                updates += self.register_updates(wb)
+            if STATS and wb is not None:
+                updates += self.stats_panel.set_lines(self.stats_lines(wb))
+            if ex is not None:
+                updates += self.label_updates(ex)
+                updates.append(AnimationGroup(*self.pulses.trigger(self.active[ex - self.base])))
+
+            if updates:
+                self.play(*updates, run_time=PLAY_TIME, rate_func=linear)
+            else:
+                self.wait(PLAY_TIME)
+            self.wait(WAIT_TIME)
+
+    def play_timeline(self, cycles: np.ndarray):
+        """
+        Plays `cycles` as one single animation: a ValueTracker holds the (fractional)
+        position in `cycles` and updaters redraw the labels and wire pulses from it.
+        Labels snap to their new value instead of morphing.
+        """
+        period = PLAY_TIME + WAIT_TIME
+        n = len(cycles)
+        position = ValueTracker(0)
+        shown = {"cycle": self.shown, "active": []}
+
+        for pulse in self.pulses.pulses:
+            pulse.hide()
+
+        def update(_):
+            t = min(position.get_value(), n - 1e-9)
+            i = int(cycles[int(t)])
+            if i != shown["cycle"]:
+                for column, label in self.labels.items():
+                    if self.label_string(column, i) != self.label_string(column, shown["cycle"]):
+                        self.update_label(column, label, i, animate=False)
+                if REGISTERS:
+                    self.register_updates(i, animate=False)
+                if HEATMAP:
+                    self.update_heatmap(i)
+                if STATS:
+                    self.stats_panel.set_lines(self.stats_lines(i), animate=False)
+                for pulse in shown["active"]:
+                    pulse.hide()
+                shown["cycle"], shown["active"] = i, self.pulses.trigger(self.active[i - self.base])
+
+            alpha = min(1.0, (t - int(t)) * period / PLAY_TIME)
+            for pulse in shown["active"]:
+                pulse.set_progress(alpha)
+
+        # manim only redraws the mobjects from the first one with an updater onward:
+        # the driver goes right after the static datapath, everything it changes after it
+        driver = Mobject().add_updater(update)
+        self.add(driver)
+        self.bring_to_front(*self.timeline_mobjects())
+        self.play(position.animate.set_value(n), run_time=n * period, rate_func=linear)
+        self.shown = shown["cycle"]
+        self.remove(driver, *(pulse.mobject for pulse in self.pulses.pulses))
+
+    def timeline_mobjects(self) -> list:
+        """what the timeline updater redraws: labels, panels and pulses"""
+        mobjects = list(self.labels.values())
+        if REGISTERS:
+            mobjects.append(self.registers)
+        if HEATMAP:
+            mobjects.append(self.heatmap)
+        if STATS:
+            mobjects.append(self.stats_panel)
+        return mobjects + [pulse.mobject for pulse in self.pulses.pulses]
+
+    def fast_forward(self, cycle: int, count: int, unit: str):
+        """skips to `cycle`, showing how many iterations/cycles were skipped"""
+        indicator = cached_text(f"×{count} {unit}", font=FONT_NAME, font_size=12, color=ACCENT_Y)
+        indicator.next_to(self.units["control"], UP)
+        self.play(FadeIn(indicator), run_time=0.15)
+        self.jump_to(cycle)
+        self.wait(0.3)
+        self.play(FadeOut(indicator), run_time=0.15)
+
+
+if PROFILER.enabled:
+    PROFILER.wrap(Animation, "value_text", "text.lookup")
+    PROFILER.wrap(HexValue, "set_value", "hex.set_value")
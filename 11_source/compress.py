@@ -0,0 +1,94 @@
+"""
+Trace compression for time-lapse renders.
+
+Loop iterations are found by cutting the PC stream at every backward jump;
+consecutive pieces with the exact same PC sequence are iterations of the same
+loop. Outside of loops, long runs of cycles lighting the same wires are
+treated the same way. `plan` keeps the first `keep` iterations (or cycles) of
+every run and turns the rest into a single skip segment, when there are at
+least `min_skip` cycles to skip: the "×K" indicator of a shorter skip would last
+longer than playing the cycles.
+"""
+import numpy as np
+
+PLAY, SKIP = "play", "skip"
+
+
+def iteration_bounds(pc) -> np.ndarray:
+    """start cycle of every loop iteration candidate (plus len(pc) at the end)"""
+    pc = np.asarray(pc)
+    cuts = np.flatnonzero(pc[1:] <= pc[:-1]) + 1
+    return np.concatenate(([0], cuts, [len(pc)]))
+
+
+def loop_runs(pc, min_repeat: int = 2) -> list:
+    """(start, stop, n_iterations, body_length) of every repeated PC sequence"""
+    pc = np.asarray(pc)
+    bounds = iteration_bounds(pc)
+    lengths = np.diff(bounds)
+
+    runs = []
+    k = 0
+    while k < len(lengths):
+        j = k + 1
+        while (j < len(lengths) and lengths[j] == lengths[k]
+               and np.array_equal(pc[bounds[j]:bounds[j + 1]], pc[bounds[k]:bounds[k + 1]])):
+            j += 1
+        if j - k >= min_repeat:
+            runs.append((int(bounds[k]), int(bounds[j]), j - k, int(lengths[k])))
+        k = j
+    return runs
+
+
+def activity_runs(active, min_length: int) -> list:
+    """
+    (start, stop) of every run of at least `min_length` cycles with identical wire activity
+    (one wire mask per cycle, or one boolean row)
+    """
+    active = np.asarray(active)
+    if len(active) == 0:
+        return []
+    changed = active[1:] != active[:-1]
+    if changed.ndim > 1:
+        changed = changed.any(axis=1)
+    changes = np.flatnonzero(changed) + 1
+    bounds = np.concatenate(([0], changes, [len(active)]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b - a >= min_length]
+
+
+def plan(pc, active, keep: int = 2, min_activity_run: int = 16, min_skip: int = 16) -> list:
+    """
+    Splits the cycles [0, len(pc)) into consecutive segments:
+        ("play", start, stop)                 cycles rendered normally
+        ("skip", start, stop, count, unit)    `count` iterations/cycles fast forwarded
+    """
+    n = len(pc)
+    skips = []
+    in_loop = np.zeros(n, dtype=bool)
+
+    for start, stop, count, body in loop_runs(pc):
+        in_loop[start:stop] = True
+        if count > keep and stop - start - keep * body >= min_skip:
+            skips.append((start + keep * body, stop, count - keep, "iterations"))
+
+    for start, stop in activity_runs(active, min_activity_run):
+        # loops already got their own treatment
+        if in_loop[start:stop].any():
+            continue
+        if stop - start - keep >= max(min_skip, 1):
+            skips.append((start + keep, stop, stop - start - keep, "cycles"))
+
+    segments = []
+    cursor = 0
+    for start, stop, count, unit in sorted(skips):
+        if start > cursor:
+            segments.append((PLAY, cursor, start))
+        segments.append((SKIP, start, stop, count, unit))
+        cursor = stop
+    if cursor < n:
+        segments.append((PLAY, cursor, n))
+    return segments
+
+
+def rendered_cycles(segments) -> int:
+    return sum(s[2] - s[1] for s in segments if s[0] == PLAY)
@@ -0,0 +1,129 @@
+"""
+Whole-trace instruction decoding.
+
+Every field is extracted for the complete `instr` column in one numpy pass, and
+each opcode is mapped through a lookup table to the set of datapath wires the
+scene pulses for it, as compiled from netlist.json. The result is one integer
+wire mask per cycle (or the same as an (n_cycles x N_WIRES) boolean matrix): the
+render loop, the timelapse planner and the preview read the same masks.
+"""
+import numpy as np
+
+from netlist import Netlist
+
+# --- RISC-V 32I Opcode Map ---
+# (Base subset only, for clarity)
+OPCODES = {
+    0x33: "R",       # ALU register
+    0x13: "I",       # ALU immediate
+    0x03: "LOAD",
+    0x23: "STORE",
+    0x63: "BRANCH",
+    0x6F: "JAL",
+    0x67: "JALR",
+    0x37: "LUI",
+    0x17: "AUIPC",
+}
+CLASSES = tuple(OPCODES.values()) + ("OTHER",)
+OTHER = CLASSES.index("OTHER")
+
+# opcode (7 bits) -> class index
+CLASS_LUT = np.full(128, OTHER, dtype=np.uint8)
+for _opcode, _name in OPCODES.items():
+    CLASS_LUT[_opcode] = CLASSES.index(_name)
+
+# class index -> wire mask (bit k: k-th wire of the netlist), see netlist.py
+NETLIST = Netlist.load()
+N_WIRES = len(NETLIST.wires)
+CLASS_BITS = NETLIST.compile(CLASSES)
+# the same masks as boolean rows
+CLASS_MASKS = NETLIST.unpack(CLASS_BITS)
+
+
+def decode_fields(instr) -> dict:
+    """splits instruction words into their RV32I fields (one array per field)"""
+    instr = np.asarray(instr, dtype=np.uint32)
+    return {
+        "opcode": (instr & 0x7F).astype(np.uint8),
+        "rd": ((instr >> 7) & 0x1F).astype(np.uint8),
+        "funct3": ((instr >> 12) & 0x7).astype(np.uint8),
+        "rs1": ((instr >> 15) & 0x1F).astype(np.uint8),
+        "rs2": ((instr >> 20) & 0x1F).astype(np.uint8),
+        "funct7": ((instr >> 25) & 0x7F).astype(np.uint8),
+    }
+
+
+def classify(instr) -> np.ndarray:
+    """class index (into CLASSES) of every instruction word"""
+    return CLASS_LUT[np.asarray(instr, dtype=np.uint32) & 0x7F]
+
+
+def activation_bits(instr) -> np.ndarray:
+    """wire mask of every cycle (bit k: the cycle pulses wire k)"""
+    return CLASS_BITS[classify(instr)]
+
+
+def activation_matrix(instr) -> np.ndarray:
+    """(n_cycles x N_WIRES) boolean matrix of the wires each cycle pulses"""
+    return CLASS_MASKS[classify(instr)]
+
+
+def _sext(value, bits: int) -> np.ndarray:
+    """sign extends the low `bits` bits of an int64 array"""
+    sign = 1 << (bits - 1)
+    return (value & ((1 << bits) - 1) ^ sign) - sign
+
+
+def immediate(instr) -> np.ndarray:
+    """sign extended immediate of every instruction word (0 for R-type), as uint32"""
+    i = np.asarray(instr, dtype=np.uint32).astype(np.int64)
+    opcode = i & 0x7F
+    imm_i = _sext(i >> 20, 12)
+    imm_s = _sext(((i >> 25) << 5) | ((i >> 7) & 0x1F), 12)
+    imm_b = _sext(((i >> 31) << 12) | (((i >> 7) & 1) << 11) | (((i >> 25) & 0x3F) << 5) | (((i >> 8) & 0xF) << 1), 13)
+    imm_u = i & 0xFFFFF000
+    imm_j = _sext(((i >> 31) << 20) | (((i >> 12) & 0xFF) << 12) | (((i >> 20) & 1) << 11) | (((i >> 21) & 0x3FF) << 1), 21)
+    imm = np.select(
+        [np.isin(opcode, (0x13, 0x03, 0x67)), opcode == 0x23, opcode == 0x63,
+         np.isin(opcode, (0x37, 0x17)), opcode == 0x6F],
+        [imm_i, imm_s, imm_b, imm_u, imm_j],
+        default=0,
+    )
+    return (imm & 0xFFFFFFFF).astype(np.uint32)
+
+
+# classes whose result is written back to rd
+WRITES_RD = np.isin(CLASSES, ("R", "I", "LOAD", "JAL", "JALR", "LUI", "AUIPC"))
+
+# classes reading rs1 / rs2
+READS_RS1 = np.isin(CLASSES, ("R", "I", "LOAD", "STORE", "BRANCH", "JALR"))
+READS_RS2 = np.isin(CLASSES, ("R", "STORE", "BRANCH"))
+
+
+def register_writes(instr) -> tuple:
+    """(rd, writes) of every row: destination register and whether the row writes it (never x0)"""
+    instr = np.asarray(instr, dtype=np.uint32)
+    rd = ((instr >> 7) & 0x1F).astype(np.uint8)
+    return rd, WRITES_RD[classify(instr)] & (rd != 0)
+
+
+def register_state(instr, wb, initial=None) -> np.ndarray:
+    """the 32 registers after the rows' writebacks (`wb` column), starting from `initial` (zeros)"""
+    state = np.zeros(32, dtype=np.uint32) if initial is None else np.array(initial, dtype=np.uint32)
+    rd, writes = register_writes(instr)
+    rows = np.flatnonzero(writes)
+    # last write of every register: first occurrence in the reversed rows
+    regs, last = np.unique(rd[rows][::-1], return_index=True)
+    state[regs] = np.asarray(wb)[rows[::-1][last]]
+    return state
+
+
+def memory_addresses(instr, R1, imm, mem=None) -> tuple:
+    """(address, access) of every row: loads and stores use `mem` when the trace has it, else rs1 + imm"""
+    op_class = classify(instr)
+    access = np.isin(op_class, (CLASSES.index("LOAD"), CLASSES.index("STORE")))
+    address = np.asarray(R1, dtype=np.uint32) + np.asarray(imm, dtype=np.uint32)  # wraps like the core
+    if mem is not None:
+        mem = np.asarray(mem, dtype=np.uint32)
+        address = np.where(mem != 0, mem, address)
+    return address, access
@@ -0,0 +1,110 @@
+"""
+RV32IM disassembler for trace columns.
+
+Traces are long but contain few distinct instruction words, so the column is
+reduced with np.unique, fields and immediates of the unique words are extracted
+with numpy (decode.py), and only those are formatted, once each (memoized
+across calls too). Output looks like the `program` list of Explanation:
+
+    add x20, x18, x19      lw x18, 0x8(x3)      beq x6, x7, 0xC
+
+python disasm.py trace_data.pkl     (prints the program, one line per cycle)
+"""
+import sys
+
+import numpy as np
+
+from decode import decode_fields, immediate
+
+R_OPS = {
+    (0, 0x00): "add", (0, 0x20): "sub", (1, 0x00): "sll", (2, 0x00): "slt", (3, 0x00): "sltu",
+    (4, 0x00): "xor", (5, 0x00): "srl", (5, 0x20): "sra", (6, 0x00): "or", (7, 0x00): "and",
+    (0, 0x01): "mul", (1, 0x01): "mulh", (2, 0x01): "mulhsu", (3, 0x01): "mulhu",
+    (4, 0x01): "div", (5, 0x01): "divu", (6, 0x01): "rem", (7, 0x01): "remu",
+}
+I_OPS = {0: "addi", 2: "slti", 3: "sltiu", 4: "xori", 6: "ori", 7: "andi"}
+SHIFT_OPS = {(1, 0x00): "slli", (5, 0x00): "srli", (5, 0x20): "srai"}
+LOADS = {0: "lb", 1: "lh", 2: "lw", 4: "lbu", 5: "lhu"}
+STORES = {0: "sb", 1: "sh", 2: "sw"}
+BRANCHES = {0: "beq", 1: "bne", 4: "blt", 5: "bge", 6: "bltu", 7: "bgeu"}
+CSR_OPS = {1: "csrrw", 2: "csrrs", 3: "csrrc", 5: "csrrwi", 6: "csrrsi", 7: "csrrci"}
+
+_memo = {}
+
+
+def signed_hex(value: int) -> str:
+    value = value - (1 << 32) if value & 0x80000000 else value
+    return f"{'-' if value < 0 else ''}0x{abs(value):X}"
+
+
+def _format(word, opcode, rd, funct3, rs1, rs2, funct7, imm) -> str:
+    x = lambda r: f"x{r}"
+    unknown = f".word 0x{word:08X}"
+
+    if opcode == 0x33:
+        name = R_OPS.get((funct3, funct7))
+        return f"{name} {x(rd)}, {x(rs1)}, {x(rs2)}" if name else unknown
+    if opcode == 0x13:
+        if funct3 in (1, 5):
+            name = SHIFT_OPS.get((funct3, funct7 & 0x7E))
+            return f"{name} {x(rd)}, {x(rs1)}, {rs2 | (funct7 & 1) << 5}" if name else unknown
+        return f"{I_OPS[funct3]} {x(rd)}, {x(rs1)}, {signed_hex(imm)}"
+    if opcode == 0x03:
+        name = LOADS.get(funct3)
+        return f"{name} {x(rd)}, {signed_hex(imm)}({x(rs1)})" if name else unknown
+    if opcode == 0x23:
+        name = STORES.get(funct3)
+        return f"{name} {x(rs2)}, {signed_hex(imm)}({x(rs1)})" if name else unknown
+    if opcode == 0x63:
+        name = BRANCHES.get(funct3)
+        return f"{name} {x(rs1)}, {x(rs2)}, {signed_hex(imm)}" if name else unknown
+    if opcode in (0x37, 0x17):
+        return f"{'lui' if opcode == 0x37 else 'auipc'} {x(rd)}, 0x{imm >> 12:X}"
+    if opcode == 0x6F:
+        return f"jal {x(rd)}, {signed_hex(imm)}"
+    if opcode == 0x67:
+        return f"jalr {x(rd)}, {signed_hex(imm)}({x(rs1)})"
+    if opcode == 0x0F:
+        return "fence"
+    if opcode == 0x73:
+        if funct3 == 0:
+            return {0: "ecall", 1: "ebreak", 0x302: "mret", 0x105: "wfi"}.get(word >> 20, unknown)
+        name = CSR_OPS.get(funct3)
+        src = str(rs1) if funct3 >= 5 else x(rs1)
+        return f"{name} {x(rd)}, 0x{word >> 20:X}, {src}" if name else unknown
+    return unknown
+
+
+def disassemble_words(words) -> list:
+    """mnemonics of distinct instruction words, formatting each word only once per process"""
+    words = np.asarray(words, dtype=np.uint32)
+    todo = np.array([w for w in words.tolist() if w not in _memo], dtype=np.uint32)
+    if len(todo):
+        fields = decode_fields(todo)
+        imms = immediate(todo).tolist()
+        columns = [fields[k].tolist() for k in ("opcode", "rd", "funct3", "rs1", "rs2", "funct7")]
+        for word, *f, imm in zip(todo.tolist(), *columns, imms):
+            _memo[word] = _format(word, *f, imm)
+    return [_memo[w] for w in words.tolist()]
+
+
+def disassemble(word: int) -> str:
+    return disassemble_words([word])[0]
+
+
+def disassemble_column(instr):
+    """
+    returns (table, index): `table` holds one mnemonic per distinct word and
+    table[index[i]] is the mnemonic of cycle i
+    """
+    uniq, index = np.unique(np.asarray(instr, dtype=np.uint32), return_inverse=True)
+    return np.array(disassemble_words(uniq), dtype=object), index.astype(np.int32)
+
+
+if __name__ == "__main__":
+    from tracefile import load_trace
+
+    trace = load_trace(sys.argv[1])
+    table, index = disassemble_column(trace["instr"])
+    for pc, i in zip(trace["pc"].tolist(), index.tolist()):
+        print(f"0x{pc:08X}  {table[i]}")
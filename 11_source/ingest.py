@@ -0,0 +1,213 @@
+"""
+Streaming trace ingestion from simulator outputs.
+
+Both readers are generators that parse their input line by line and yield one
+dict per retired instruction; `write_rows` batches them into fixed size numpy
+chunks and streams those into a .trace file, so multi-GB logs are converted in
+constant memory.
+
+Column meaning (see tracefile.py): pc (next pc, simulators logging the
+instruction address are converted with `to_next_pc`), instr, R1/R2 (rs1/rs2 values read), imm (decoded from
+instr when the source doesn't provide it), mem (data memory address, 0 when
+the instruction doesn't access memory), wb (value written to rd, 0 if none).
+
+python ingest.py spike commit.log[.gz] out.trace
+python ingest.py vcd sim.vcd out.trace --clock tb.clk --valid tb.dut.retire --pc-address \\
+    --signal pc=tb.dut.pc --signal instr=tb.dut.instr --signal R1=tb.dut.rs1_data ...
+"""
+import argparse
+import gzip
+import re
+
+import numpy as np
+
+from decode import immediate
+from tracefile import COLUMNS, TraceWriter
+
+CHUNK = 1 << 16
+
+
+def _open(path):
+    return gzip.open(path, "rt") if str(path).endswith(".gz") else open(path)
+
+
+# --- Spike ---------------------------------------------------------------
+#   core   0: 3 0x80000010 (0x0182b283) x5  0x0000000080000018 mem 0x0000000080000018
+#   core   0: 3 0x80000014 (0x00b2a023) mem 0x0000000080000020 0x0000000000000007
+# the privilege level only appears on commit lines, not on the -l disassembly lines
+COMMIT = re.compile(r"core\s+\d+:\s+\d+\s+0x([0-9a-fA-F]+)\s+\(0x([0-9a-fA-F]+)\)(.*)")
+REG_WRITE = re.compile(r"\bx\s*(\d+)\s+0x([0-9a-fA-F]+)")
+MEM = re.compile(r"\bmem\s+0x([0-9a-fA-F]+)")
+
+
+def read_spike(path):
+    """
+    yields trace rows from a spike --log-commits log, register values are tracked from the writes.
+    pc is the instruction address, see to_next_pc
+    """
+    regs = [0] * 32
+    with _open(path) as f:
+        for line in f:
+            m = COMMIT.match(line.strip())
+            if m is None:
+                continue
+            pc, instr, rest = int(m.group(1), 16), int(m.group(2), 16), m.group(3)
+            rs1, rs2 = (instr >> 15) & 0x1F, (instr >> 20) & 0x1F
+            row = {"pc": pc, "instr": instr, "R1": regs[rs1], "R2": regs[rs2], "mem": 0, "wb": 0}
+
+            mem = MEM.search(rest)
+            if mem:
+                row["mem"] = int(mem.group(1), 16)
+            write = REG_WRITE.search(rest)
+            if write:
+                rd, value = int(write.group(1)), int(write.group(2), 16) & 0xFFFFFFFF
+                row["wb"] = value
+                if rd:
+                    regs[rd] = value
+            yield row
+
+
+def to_next_pc(rows):
+    """rows whose pc is the instruction address -> rows whose pc is the next pc (tracefile.py)"""
+    prev = None
+    for row in rows:
+        if prev is not None:
+            prev["pc"] = row["pc"]
+            yield prev
+        prev = row
+    # the last instruction's successor is unknown: not taken
+    if prev is not None:
+        prev["pc"] = (prev["pc"] + 4) & 0xFFFFFFFF
+        yield prev
+
+
+# --- VCD -----------------------------------------------------------------
+
+def _vcd_header(f):
+    """reads the declarations, returns {hierarchical name: id code}"""
+    scope, ids = [], {}
+    tokens = []
+    for line in f:
+        tokens += line.split()
+        while "$end" in tokens:
+            end = tokens.index("$end")
+            decl, tokens = tokens[:end], tokens[end + 1:]
+            if not decl:
+                continue
+            if decl[0] == "$scope":
+                scope.append(decl[2])
+            elif decl[0] == "$upscope":
+                scope.pop()
+            elif decl[0] == "$var":
+                # $var wire 32 ! pc [31:0] $end
+                ids[".".join(scope + [decl[4]])] = decl[3]
+            elif decl[0] == "$enddefinitions":
+                return ids
+    raise ValueError("no $enddefinitions in VCD header")
+
+
+def _find(ids: dict, name: str) -> str:
+    matches = [code for full, code in ids.items() if full == name or full.endswith("." + name)]
+    if len(matches) != 1:
+        raise ValueError(f"signal {name!r} matches {len(matches)} VCD variables")
+    return matches[0]
+
+
+def _value(text: str) -> int:
+    # x and z bits read as 0
+    return int(text.translate(str.maketrans("xXzZ", "0000")) or "0", 2)
+
+
+def read_vcd(path, signals: dict, clock: str, valid: str = None):
+    """
+    yields trace rows sampled on every rising edge of `clock` (values as they were
+    right before the edge), optionally only when `valid` is 1.
+    `signals` maps trace columns to VCD signal names (full path or unique suffix).
+    """
+    with _open(path) as f:
+        ids = _vcd_header(f)
+        columns = {col: _find(ids, name) for col, name in signals.items()}
+        clk = _find(ids, clock)
+        valid_id = _find(ids, valid) if valid else None
+        watched = set(columns.values()) | {clk} | ({valid_id} if valid_id else set())
+
+        values = dict.fromkeys(watched, 0)
+        before = dict(values)
+        for line in f:
+            line = line.strip()
+            if not line or line[0] == "$":
+                continue
+            if line[0] == "#":
+                before = dict(values)
+                continue
+            if line[0] in "bB":
+                bits, code = line[1:].split()
+            elif line[0] in "rR":
+                continue
+            else:
+                bits, code = line[0], line[1:]
+            if code not in watched:
+                continue
+            value = _value(bits)
+            if code == clk and value == 1 and values[clk] == 0:
+                if valid_id is None or before[valid_id]:
+                    yield {col: before[code_] for col, code_ in columns.items()}
+            values[code] = value
+
+
+# --- writing -------------------------------------------------------------
+
+def write_rows(rows, path, chunk: int = CHUNK) -> int:
+    """streams trace rows into a .trace file, returns the number of cycles written"""
+    with TraceWriter(path, COLUMNS) as writer:
+        buf = {k: [] for k in COLUMNS}
+        missing = set(COLUMNS)
+
+        def flush():
+            if not buf["pc"]:
+                return
+            arrays = {k: np.array(v, dtype=np.uint64) & 0xFFFFFFFF for k, v in buf.items()}
+            if "imm" in missing:
+                arrays["imm"] = immediate(arrays["instr"])
+            writer.write_chunk(arrays)
+            for v in buf.values():
+                v.clear()
+
+        for row in rows:
+            missing &= set(COLUMNS) - row.keys()
+            for k in COLUMNS:
+                buf[k].append(row.get(k, 0))
+            if len(buf["pc"]) >= chunk:
+                flush()
+        flush()
+        return writer.n_cycles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("format", choices=("spike", "vcd"))
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--clock", help="VCD clock signal")
+    parser.add_argument("--valid", help="VCD signal marking retired instructions")
+    parser.add_argument("--pc-address", action="store_true",
+                        help="the VCD pc signal is the address of the retired instruction, not the next pc")
+    parser.add_argument("--signal", action="append", default=[], metavar="COLUMN=NAME",
+                        help="VCD signal of a trace column (pc, instr, R1, R2, imm, mem, wb)")
+    args = parser.parse_args()
+
+    if args.format == "spike":
+        rows = to_next_pc(read_spike(args.input))
+    else:
+        signals = dict(s.split("=", 1) for s in args.signal)
+        if not args.clock or not {"pc", "instr"} <= signals.keys():
+            parser.error("vcd needs --clock and at least --signal pc=... --signal instr=...")
+        rows = read_vcd(args.input, signals, args.clock, args.valid)
+        if args.pc_address:
+            rows = to_next_pc(rows)
+
+    print(f"{write_rows(rows, args.output)} cycles written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+The datapath as data: units, wires, and the wires each instruction class uses.
+
+netlist.json (or the file named by BRH_NETLIST) holds
+- units : name -> builder ("logic_unit", "alu", "mux") and its arguments
+- wires : name, source unit, destination unit and connect() options, in order.
+  The order is the bit order of the masks, and the order of the scene's pulses
+- paths : instruction class (decode.CLASSES) -> names of the wires it pulses
+
+The file is validated when loaded (wires to unknown units, paths through unknown
+wires, duplicate names, two wires with the same endpoints and options) and the
+paths are compiled once into one integer mask per class, bit k being wire k.
+Decoding a cycle is then one lookup in that table.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+NETLIST = Path(os.environ.get("BRH_NETLIST", HERE / "netlist.json"))
+BUILDERS = ("logic_unit", "alu", "mux")
+
+
+def _no_duplicate_keys(pairs: list) -> dict:
+    keys = [k for k, _ in pairs]
+    duplicates = sorted({k for k in keys if keys.count(k) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate keys {duplicates}")
+    return dict(pairs)
+
+
+class Netlist:
+    def __init__(self, data: dict, source: str = "netlist"):
+        self.source = source
+        self.units = data["units"]
+        self.wires = data["wires"]
+        self.paths = data["paths"]
+        self.names = [wire["name"] for wire in self.wires]
+        self.index = {name: k for k, name in enumerate(self.names)}
+        self.validate()
+        self.dtype = np.uint32 if len(self.wires) <= 32 else np.uint64
+
+    @classmethod
+    def load(cls, path=NETLIST) -> "Netlist":
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(), object_pairs_hook=_no_duplicate_keys)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        return cls(data, str(path))
+
+    def error(self, message: str):
+        raise ValueError(f"{self.source}: {message}")
+
+    def validate(self):
+        for name, unit in self.units.items():
+            if unit.get("builder") not in BUILDERS:
+                self.error(f"unit {name}: builder {unit.get('builder')!r} is not one of {BUILDERS}")
+
+        seen = {}
+        for wire in self.wires:
+            name = wire["name"]
+            if self.names.count(name) > 1:
+                self.error(f"wire {name} is defined {self.names.count(name)} times")
+            for end in ("src", "dst"):
+                if wire[end] not in self.units:
+                    self.error(f"wire {name}: {end} {wire[end]!r} is not a unit")
+            # same endpoints and options: drawn on top of each other
+            geometry = json.dumps({k: v for k, v in wire.items() if k != "name"}, sort_keys=True)
+            if geometry in seen:
+                self.error(f"wire {name} duplicates {seen[geometry]}")
+            seen[geometry] = name
+        if len(self.wires) > 64:
+            self.error(f"{len(self.wires)} wires, masks hold at most 64")
+
+        for cls, wires in self.paths.items():
+            for name in wires:
+                if name not in self.index:
+                    self.error(f"path {cls}: no wire {name}")
+            if len(set(wires)) != len(wires):
+                self.error(f"path {cls} lists a wire twice")
+
+    def compile(self, classes: tuple) -> np.ndarray:
+        """mask of every class of `classes`, bit k set when the class pulses wire k"""
+        missing = [c for c in classes if c not in self.paths]
+        unknown = [c for c in self.paths if c not in classes]
+        if missing or unknown:
+            self.error(f"paths: missing classes {missing}, unknown classes {unknown}")
+        masks = np.zeros(len(classes), dtype=self.dtype)
+        for k, cls in enumerate(classes):
+            for name in self.paths[cls]:
+                masks[k] |= self.dtype(1) << self.dtype(self.index[name])
+        return masks
+
+    def unpack(self, masks) -> np.ndarray:
+        """(... x n_wires) boolean rows of integer masks"""
+        masks = np.asarray(masks, dtype=self.dtype)
+        return (masks[..., None] >> np.arange(len(self.wires), dtype=self.dtype) & 1).astype(bool)
+
+
+def wires_of(mask) -> list:
+    """indices of the bits set in a mask"""
+    mask, wires, k = int(mask), [], 0
+    while mask:
+        if mask & 1:
+            wires.append(k)
+        mask >>= 1
+        k += 1
+    return wires
@@ -0,0 +1,181 @@
+"""
+Overlays showing state the datapath itself doesn't: architectural registers,
+data memory traffic, instructions in flight in the pipeline, statistics.
+
+Panels keep the values they display in numpy arrays and only touch the
+mobjects of the entries that changed, so their per-cycle cost is the number of
+changed entries, not the panel size.
+"""
+import numpy as np
+from manim import (Group, VGroup, VMobject, ImageMobject, Rectangle, ManimColor, Transform, FadeIn,
+                   RESAMPLING_ALGORITHMS, WHITE, BLACK, GRAY, RIGHT, LEFT, DOWN, UP)
+
+from common.text_cache import cached_text
+from pipeline import STAGES, EMPTY
+
+
+def hex32(x) -> str:
+    return f"0x{int(x) & 0xFFFFFFFF:08X}"
+
+
+class RegisterPanel(VGroup):
+    """the 32 registers as a grid of `x5 0x00000064` entries"""
+
+    def __init__(self, values, font: str = "", font_size: float = 8, color=WHITE, columns: int = 8):
+        super().__init__()
+        self.font, self.font_size, self.color = font, font_size, color
+        self.values = np.array(values, dtype=np.uint32)
+        self.cycle = None  # trace row the panel shows
+        self.names = [cached_text(f"x{r}", font=font, font_size=font_size, color=color).set_opacity(0.6)
+                      for r in range(32)]
+        self.entries = [self.value_text(v) for v in self.values]
+        cells = [VGroup(name, entry).arrange(RIGHT, buff=0.06) for name, entry in zip(self.names, self.entries)]
+        # names right aligned on their value, so the values line up in columns
+        grid = VGroup(*cells).arrange_in_grid(cols=columns, buff=(0.2, 0.06), cell_alignment=RIGHT)
+        self.add(grid)
+
+    def value_text(self, value):
+        return cached_text(hex32(value), font=self.font, font_size=self.font_size, color=self.color)
+
+    def set_values(self, values, animate: bool = True) -> list:
+        """
+        moves the panel to `values`, re-laying out the changed entries only.
+        Returns their Transforms to play when animated, else snaps them
+        """
+        values = np.asarray(values, dtype=np.uint32)
+        updates = []
+        for r in np.flatnonzero(values != self.values):
+            entry = self.entries[r]
+            target = self.value_text(values[r]).move_to(entry, LEFT)
+            if animate:
+                updates.append(Transform(entry, target))
+            else:
+                entry.become(target)
+        self.values = values.copy()
+        return updates
+
+
+class Heatmap(Group):
+    """
+    data memory accesses binned by address into a small grid, drawn as one
+    ImageMobject (a pixel per bin). Its cost doesn't depend on the number of accesses
+    """
+
+    def __init__(self, lo: int, hi: int, shape=(16, 16), height: float = 1.2, cold=BLACK, hot=WHITE,
+                 font: str = "", font_size: float = 8, color=WHITE):
+        super().__init__()
+        self.shape = shape
+        self.lo = lo >> 2  # word addresses
+        self.span = max(1, (hi >> 2) - self.lo + 1)
+        self.cold = np.array(ManimColor(cold).to_rgb() * 255)
+        self.hot = np.array(ManimColor(hot).to_rgb() * 255)
+        self.counts = np.zeros(shape[0] * shape[1], dtype=np.int64)
+        self.cycle = None  # last trace row counted
+
+        self.image = ImageMobject(self.pixels())
+        self.image.set_resampling_algorithm(RESAMPLING_ALGORITHMS["nearest"])
+        self.image.height = height
+        border = Rectangle(width=self.image.width, height=self.image.height, color=color, stroke_width=1)
+        caption = cached_text(f"{hex32(lo)}-{hex32(hi)}", font=font, font_size=font_size, color=color)
+        self.add(self.image, border.move_to(self.image), caption.next_to(self.image, DOWN, buff=0.06))
+
+    def bins(self, address, access) -> np.ndarray:
+        """bin of every row's address, -1 for rows without an access"""
+        words = (np.asarray(address, dtype=np.uint32) >> 2).astype(np.int64)
+        bins = np.clip((words - self.lo) * len(self.counts) // self.span, 0, len(self.counts) - 1)
+        return np.where(access, bins, -1)
+
+    def pixels(self) -> np.ndarray:
+        # log scale, so a hot loop doesn't hide everything else
+        heat = np.log1p(self.counts) / np.log1p(max(1, self.counts.max()))
+        rgb = self.cold + (self.hot - self.cold) * heat[:, None]
+        alpha = np.full((len(heat), 1), 255)
+        return np.hstack([rgb, alpha]).round().astype(np.uint8).reshape(*self.shape, 4)
+
+    def accumulate(self, bins):
+        """adds the accesses of some rows and redraws the image"""
+        bins = np.asarray(bins)
+        self.counts += np.bincount(bins[bins >= 0], minlength=len(self.counts))
+        self.image.pixel_array[...] = self.pixels()
+
+
+class PipelineView(VGroup):
+    """
+    one slot per pipeline stage. The slot labels are a ring: an instruction moving
+    to the next stage takes its label along, and only the slots getting new content
+    (a fetch, a bubble) are re-laid out, recycling the labels that left
+    """
+
+    def __init__(self, font: str = "", font_size: float = 8, color=WHITE, bubble_color=GRAY,
+                 slot_width: float = 1.3, slot_height: float = 0.3):
+        super().__init__()
+        self.font, self.font_size, self.color, self.bubble_color = font, font_size, color, bubble_color
+        self.slots = VGroup(*[Rectangle(width=slot_width, height=slot_height, color=color, stroke_width=1)
+                              for _ in STAGES]).arrange(RIGHT, buff=0.1)
+        names = VGroup(*[cached_text(stage, font=font, font_size=font_size, color=color).next_to(slot, UP, buff=0.05)
+                         for stage, slot in zip(STAGES, self.slots)])
+        self.tokens = [None] * len(STAGES)
+        self.labels = [VMobject() for _ in STAGES]
+        self.add(self.slots, names, *self.labels)
+
+    def slot_text(self, token, describe):
+        if isinstance(token, tuple):
+            kind = token[0]
+            return cached_text("-" if kind == EMPTY else kind, font=self.font, font_size=self.font_size,
+                               color=self.bubble_color)
+        return cached_text(describe(token), font=self.font, font_size=self.font_size, color=self.color)
+
+    def set_slots(self, tokens: list, describe, animate: bool = True) -> list:
+        """
+        shows `tokens` (see pipeline.Schedule.occupancy), `describe(k)` being the text of
+        instruction k. Returns the moves and fades to play when animated, else snaps them
+        """
+        # labels of the tokens still in the pipeline move along, the others (and the
+        # labels of slots that never held anything) are free to show new content
+        held = {token: label for token, label in zip(self.tokens, self.labels) if token is not None}
+        labels = [held.pop(token, None) for token in tokens]
+        kept = {id(label) for label in labels if label is not None}
+        free = [label for label in self.labels if id(label) not in kept]
+        updates = []
+        for stage, (token, label) in enumerate(zip(tokens, labels)):
+            center = self.slots[stage].get_center()
+            if label is None:
+                label = labels[stage] = free.pop()
+                label.become(self.slot_text(token, describe).move_to(center))
+                if animate:
+                    updates.append(FadeIn(label))
+            elif not np.allclose(label.get_center(), center):
+                if animate:
+                    updates.append(label.animate.move_to(center))
+                else:
+                    label.move_to(center)
+        self.tokens, self.labels = list(tokens), labels
+        return updates
+
+
+class TextLines(VGroup):
+    """left aligned lines of text, only the lines whose text changed are re-laid out"""
+
+    def __init__(self, lines: list, font: str = "", font_size: float = 8, color=WHITE):
+        super().__init__()
+        self.font, self.font_size, self.color = font, font_size, color
+        self.strings = list(lines)
+        self.add(*[self.line_text(line) for line in lines])
+        self.arrange(DOWN, aligned_edge=LEFT, buff=0.06)
+
+    def line_text(self, line: str):
+        return cached_text(line, font=self.font, font_size=self.font_size, color=self.color)
+
+    def set_lines(self, lines: list, animate: bool = True) -> list:
+        """same as RegisterPanel.set_values, for lines of text"""
+        updates = []
+        for k, (old, new) in enumerate(zip(self.strings, lines)):
+            if old == new:
+                continue
+            target = self.line_text(new).move_to(self[k], LEFT)
+            if animate:
+                updates.append(Transform(self[k], target))
+            else:
+                self[k].become(target)
+        self.strings = list(lines)
+        return updates
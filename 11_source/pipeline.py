@@ -0,0 +1,78 @@
+"""
+Five-stage (IF ID EX MEM WB) pipeline timing of a trace.
+
+The trace lists committed instructions in order; the schedule gives every one
+of them its stage entry cycles for a classic in-order pipeline with branches
+resolved in EX and no load forwarding into the next instruction:
+
+- load-use: an instruction reading the rd of the load right before it waits one
+  extra cycle in ID (a stall bubble goes down EX, MEM, WB), and the one behind it
+  waits in IF
+- taken control transfer (next pc != address + 4, pc being the next pc, see
+  tracefile.py): the two wrong-path instructions
+  fetched meanwhile are flushed (bubbles in IF and ID)
+
+Everything is a cumulative sum over the trace; the occupancy of the five stages
+at any pipeline cycle is then a couple of binary searches.
+"""
+import numpy as np
+
+from decode import decode_fields, classify, READS_RS1, READS_RS2, CLASSES
+
+STAGES = ("IF", "ID", "EX", "MEM", "WB")
+IF, ID, EX, MEM, WB = range(5)
+STALL, FLUSH, EMPTY = "stall", "flush", "empty"
+
+
+class Schedule:
+    """stage entry cycles of every instruction of a trace window"""
+
+    def __init__(self, pc, instr):
+        pc = np.asarray(pc, dtype=np.uint32)
+        fields = decode_fields(instr)
+        op_class = classify(instr)
+        n = len(pc)
+
+        # load-use: the previous instruction is a load whose rd this one reads
+        prev_load = np.zeros(n, dtype=bool)
+        prev_load[1:] = (op_class[:-1] == CLASSES.index("LOAD")) & (fields["rd"][:-1] != 0)
+        prev_rd = np.concatenate(([0], fields["rd"][:-1]))
+        self.stall = prev_load & (
+            (READS_RS1[op_class] & (fields["rs1"] == prev_rd)) | (READS_RS2[op_class] & (fields["rs2"] == prev_rd)))
+        # pc is the next pc, the address of instruction i is pc[i - 1]
+        # (the first instruction's address is unknown: not taken)
+        self.taken = np.zeros(n, dtype=bool)
+        self.taken[1:] = pc[1:] != pc[:-1] + np.uint32(4)
+
+        # ID entry: one cycle after the previous one, + its stall, + 2 after a taken transfer
+        step = 1 + self.stall[:-1] + 2 * self.taken[:-1]
+        self.decode = np.concatenate(([1], 1 + np.cumsum(step))).astype(np.int64)
+        self.execute = self.decode + 1 + self.stall
+        # IF entry: when the previous instruction moves to ID, or after it resolved a taken transfer
+        self.fetch = np.concatenate(([0], np.where(self.taken[:-1], self.decode[1:] - 1, self.decode[:-1])))
+
+    def __len__(self) -> int:
+        """number of pipeline cycles, until the last instruction leaves WB"""
+        return int(self.execute[-1]) + 3 if len(self.execute) else 0
+
+    def _bubble(self, t: int, stage: int):
+        """bubble at `stage` on cycle `t`, identified by the cycle it would have entered IF"""
+        if not 0 <= t - stage <= self.fetch[-1]:
+            return (EMPTY, t - stage)  # filling up / draining
+        # first instruction still to enter EX after the gap tells why the gap is there
+        k = min(np.searchsorted(self.execute, t - (stage - EX)), len(self.execute) - 1) if stage >= EX else \
+            min(np.searchsorted(self.decode, t + (ID - stage), side="right"), len(self.decode) - 1)
+        kind = FLUSH if k > 0 and self.taken[k - 1] else STALL
+        return (kind, t - stage)
+
+    def occupancy(self, t: int) -> list:
+        """per stage, the instruction index it holds on cycle `t`, or a (kind, id) bubble"""
+        slots = []
+        for stage, (enter, leave) in enumerate(((self.fetch, self.decode), (self.decode, self.execute))):
+            k = np.searchsorted(enter, t, side="right") - 1
+            slots.append(int(k) if k >= 0 and t < leave[k] else self._bubble(t, stage))
+        for stage in (EX, MEM, WB):
+            k = np.searchsorted(self.execute, t - (stage - EX))
+            hit = k < len(self.execute) and self.execute[k] == t - (stage - EX)
+            slots.append(int(k) if hit else self._bubble(t, stage))
+        return slots
@@ -0,0 +1,275 @@
+"""
+Fast preview of the trace playback, to check timing and which wires light up.
+
+Cairo mostly runs while setting up: the static datapath is rasterized once into
+a numpy image, every wire pulse is rasterized once per frame of its animation
+(alpha masks, as it looks at that frame), and every distinct label string once
+(alpha bitmap, cached). The panels (BRH_REGISTERS, BRH_HEATMAP, BRH_STATS) are
+rasterized again on the cycles they change. A frame is then the background
+image plus a few masks blended in, piped straight to ffmpeg as raw RGB.
+
+python preview.py --end 5000 -r 854,480 -f 15 -o preview.mp4
+
+Same trace, window and options (BRH_TRACE, BRH_CYCLE_START, BRH_SEEK_PC,
+BRH_STRIDE, BRH_TIMELAPSE, BRH_MNEMONICS, the panels ...) as animation.py.
+Differences with the real render: labels and panels snap to their new value at
+the start of the cycle instead of morphing, and BRH_PIPELINE is not previewed
+(the cycles play in trace order, without the stage slots).
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from manim import config, Camera, ManimColor, DL, UR, UP
+
+from animation import (Animation, PulsePool, BACKGROUND, LIGHT, ACCENT_Y, FONT_NAME, PLAY_TIME, WAIT_TIME,
+                       CYCLE_START, CYCLE_END, STRIDE, TIMELAPSE, REGISTERS, HEATMAP, STATS, PIPELINE)
+from common.text_cache import cached_text
+from compress import plan, PLAY
+from netlist import wires_of
+
+HERE = Path(__file__).resolve().parent
+MAX_LABELS = 50000  # label bitmaps kept before starting over
+
+
+def rgb(color) -> np.ndarray:
+    return (ManimColor(color).to_rgb() * 255).round().astype(np.uint16)
+
+
+class Raster:
+    """rasterizes mobjects at the output resolution, as alpha bitmaps placed in the frame"""
+
+    def __init__(self, width: int, height: int):
+        self.width, self.height = width, height
+        self.scale = width / config.frame_width  # pixels per unit
+
+    def to_pixels(self, point) -> np.ndarray:
+        return np.array([point[0] * self.scale + self.width / 2, self.height / 2 - point[1] * self.scale])
+
+    def background(self, mobjects: list) -> np.ndarray:
+        camera = Camera(pixel_width=self.width, pixel_height=self.height, background_color=BACKGROUND)
+        camera.capture_mobjects(mobjects)
+        return np.ascontiguousarray(camera.pixel_array[..., :3])
+
+    def window(self, mob, pad: int = 2) -> tuple:
+        """pixel box (x0, y0, x1, y1) around a mobject"""
+        (x0, y1), (x1, y0) = self.to_pixels(mob.get_corner(DL)), self.to_pixels(mob.get_corner(UR))
+        return (int(np.floor(x0)) - pad, int(np.floor(y0)) - pad,
+                int(np.ceil(x1)) + pad, int(np.ceil(y1)) + pad)
+
+    def capture(self, mob, box: tuple) -> np.ndarray:
+        """rgba (premultiplied, as cairo draws it) of `mob` in the pixel box, at the same scale as the full frame"""
+        x0, y0, x1, y1 = box
+        center = np.array([((x0 + x1) / 2 - self.width / 2) / self.scale,
+                           (self.height / 2 - (y0 + y1) / 2) / self.scale, 0])
+        # same pixels per unit as the full frame, so strokes keep their width
+        camera = Camera(pixel_width=x1 - x0, pixel_height=y1 - y0,
+                        frame_width=(x1 - x0) / self.scale, frame_height=(y1 - y0) / self.scale,
+                        frame_center=center, background_opacity=0)
+        camera.capture_mobjects([mob])
+        return camera.pixel_array
+
+    def alpha(self, mob, box: tuple) -> tuple:
+        """(x0, y0, coverage) of `mob` drawn in the pixel box"""
+        return box[0], box[1], self.capture(mob, box)[..., 3].copy()
+
+    def rgba(self, mob, box: tuple) -> tuple:
+        """(x0, y0, rgba) of `mob` drawn in the pixel box, for mobjects of several colors"""
+        return box[0], box[1], self.capture(mob, box).copy()
+
+
+def blend(frame: np.ndarray, bitmap: tuple, color: np.ndarray):
+    """blends a (x0, y0, coverage) bitmap of a solid color into the frame, in place"""
+    x0, y0, alpha = bitmap
+    h, w = alpha.shape
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1, fy1 = min(x0 + w, frame.shape[1]), min(y0 + h, frame.shape[0])
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+    a = alpha[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0, None].astype(np.uint16)
+    region = frame[fy0:fy1, fx0:fx1]
+    region[:] = (region * (255 - a) + color * a + 127) // 255
+
+
+def composite(frame: np.ndarray, bitmap: tuple):
+    """draws a (x0, y0, premultiplied rgba) bitmap over the frame, in place"""
+    x0, y0, pixels = bitmap
+    h, w = pixels.shape[:2]
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1, fy1 = min(x0 + w, frame.shape[1]), min(y0 + h, frame.shape[0])
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+    src = pixels[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0].astype(np.uint16)
+    a = src[..., 3:]
+    region = frame[fy0:fy1, fx0:fx1]
+    region[:] = np.minimum((region * (255 - a) + 127) // 255 + src[..., :3], 255)
+
+
+class Preview:
+    def __init__(self, width: int, height: int, fps: int, start: int, stop: int):
+        self.fps = fps
+        self.raster = Raster(width, height)
+
+        # the real scene builds the datapath, decodes the window and places the labels,
+        # nothing is rendered through it
+        self.scene = scene = Animation()
+        scene.build_datapath()
+        self.start, self.stop = scene.load_window(start, stop)
+        scene.setup_labels(scene.base)
+        self.centers = {column: label.get_center() for column, label in scene.labels.items()}
+        self.base = self.raster.background([*scene.units.values(), *scene.wires])
+        self.panels = {}  # panel -> (state it was rasterized at, bitmap)
+        if REGISTERS:
+            scene.setup_registers(scene.base)
+        if HEATMAP:
+            scene.setup_heatmap(scene.base)
+        if STATS:
+            scene.setup_stats(scene.base)
+
+        # manim's frame times: arange(0, run_time, 1 / fps)
+        self.play_alphas = np.arange(0, PLAY_TIME, 1 / fps) / PLAY_TIME
+        self.wait_frames = len(np.arange(0, WAIT_TIME, 1 / fps))
+        self.masks = self.pulse_masks(PulsePool(scene.wires))
+        self.labels = {}
+        self.light, self.accent = rgb(LIGHT), rgb(ACCENT_Y)
+
+    def pulse_masks(self, pulses: PulsePool) -> list:
+        """masks[wire][frame] : the wire's pulse at every frame of a cycle's play"""
+        masks = []
+        for pulse in pulses.pulses:
+            box = self.raster.window(pulse.wire, pad=int(np.ceil(0.04 * self.raster.scale)) + 2)
+            frames = []
+            for alpha in self.play_alphas:
+                pulse.set_progress(alpha)
+                frames.append(self.raster.alpha(pulse.mobject, box))
+            masks.append(frames)
+        return masks
+
+    def label_bitmap(self, column: str, cycle: int) -> tuple:
+        string = self.scene.label_string(column, cycle)
+        bitmap = self.labels.get((column, string))
+        if bitmap is None:
+            if len(self.labels) >= MAX_LABELS:
+                self.labels.clear()
+            # the same mobject as the real render's label (HexValue or text)
+            mob = self.scene.make_label(column, cycle).move_to(self.centers[column])
+            bitmap = self.labels[(column, string)] = self.raster.alpha(mob, self.raster.window(mob))
+        return bitmap
+
+    def panel_bitmaps(self, cycle: int) -> list:
+        """the enabled panels brought to `cycle`, rasterized again when their content changed"""
+        scene, panels = self.scene, []
+        if REGISTERS:
+            scene.register_updates(cycle, animate=False)
+            panels.append((scene.registers, scene.registers.values.tobytes()))
+        if HEATMAP:
+            scene.update_heatmap(cycle)
+            panels.append((scene.heatmap, scene.heatmap.cycle))
+        if STATS:
+            scene.stats_panel.set_lines(scene.stats_lines(cycle), animate=False)
+            panels.append((scene.stats_panel, tuple(scene.stats_panel.strings)))
+
+        bitmaps = []
+        for panel, state in panels:
+            shown, bitmap = self.panels.get(id(panel), (None, None))
+            if shown != state:
+                bitmap = self.raster.rgba(panel, self.raster.window(panel))
+                self.panels[id(panel)] = (state, bitmap)
+            bitmaps.append(bitmap)
+        return bitmaps
+
+    def still(self, cycle: int) -> np.ndarray:
+        """background plus the labels and panels showing `cycle`"""
+        frame = self.base.copy()
+        for column in self.centers:
+            blend(frame, self.label_bitmap(column, cycle), self.light)
+        for bitmap in self.panel_bitmaps(cycle):
+            composite(frame, bitmap)
+        return frame
+
+    def cycle_frames(self, i: int):
+        still = self.still(i)
+        wires = wires_of(self.scene.active[i - self.scene.base])
+        for k in range(len(self.play_alphas)):
+            frame = still.copy()
+            for w in wires:
+                blend(frame, self.masks[w][k], self.accent)
+            yield frame
+        for _ in range(self.wait_frames):
+            yield still
+
+    def skip_frames(self, cycle: int, count: int, unit: str):
+        """fast forward : the "×K unit" indicator over the labels of `cycle`"""
+        indicator = cached_text(f"×{count} {unit}", font=FONT_NAME, font_size=12, color=ACCENT_Y)
+        indicator.next_to(self.scene.units["control"], UP)
+        frame = self.still(cycle)
+        blend(frame, self.raster.alpha(indicator, self.raster.window(indicator)), self.accent)
+        for _ in range(round(0.6 * self.fps)):
+            yield frame
+
+    def frames(self):
+        cycles = np.arange(self.start, self.stop, STRIDE)
+        if not TIMELAPSE:
+            for i in cycles:
+                yield from self.cycle_frames(int(i))
+            return
+
+        scene = self.scene
+        segments = plan(scene.data["pc"][cycles], scene.active[cycles - scene.base], keep=TIMELAPSE)
+        for kind, first, last, *skipped in segments:
+            if kind == PLAY:
+                for i in cycles[first:last]:
+                    yield from self.cycle_frames(int(i))
+            else:
+                yield from self.skip_frames(int(cycles[last - 1]), *skipped)
+
+    def write(self, output: Path) -> int:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        cmd = ["ffmpeg", "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{self.raster.width}x{self.raster.height}",
+               "-r", str(self.fps), "-i", "-",
+               "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", str(output)]
+        ffmpeg = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        n = 0
+        try:
+            for frame in self.frames():
+                ffmpeg.stdin.write(frame.data)
+                n += 1
+        finally:
+            ffmpeg.stdin.close()
+            if ffmpeg.wait():
+                raise RuntimeError(f"ffmpeg exited with {ffmpeg.returncode}")
+        return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=int, default=CYCLE_START)
+    parser.add_argument("--end", type=int, default=CYCLE_END, help="default: BRH_MAX_CYCLES rows after the start")
+    parser.add_argument("-r", "--resolution", default="854,480", help="width,height")
+    parser.add_argument("-f", "--fps", type=int, default=15)
+    parser.add_argument("-o", "--output", type=Path, default=HERE / "media" / "Animation_preview.mp4")
+    args = parser.parse_args()
+
+    if PIPELINE:
+        print("preview.py: BRH_PIPELINE is not previewed, the cycles play in trace order", file=sys.stderr)
+
+    width, height = map(int, args.resolution.split(","))
+    config.pixel_width, config.pixel_height = width, height
+    config.frame_width = config.frame_height * width / height
+    config.frame_rate = args.fps
+
+    t0 = time.perf_counter()
+    preview = Preview(width, height, args.fps, args.start, args.end)
+    t1 = time.perf_counter()
+    n = preview.write(args.output)
+    t2 = time.perf_counter()
+    print(f"{args.output} : cycles {preview.start}-{preview.stop}, {n} frames, "
+          f"setup {t1 - t0:.1f}s, {n / max(t2 - t1, 1e-9):.0f} frames/s, {len(preview.labels)} label bitmaps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Opt-in instrumentation of the trace playback hot paths.
+
+    BRH_PROFILE=1 manim -ql animation.py Animation            -> profile_trace.json
+    BRH_PROFILE=out.json manim -ql animation.py Animation
+
+Wrapped functions are timed and counted, every span is attributed to the
+cycle (and opcode class) being played. At the end a summary table is printed
+and a Chrome trace is written (open it in chrome://tracing or ui.perfetto.dev).
+"""
+import functools
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Profiler:
+    def __init__(self, output=None):
+        self.enabled = output is not None
+        self.output = output
+        self.events = []
+        self.current = {"cycle": None, "class": None}
+        self.t0 = time.perf_counter()
+
+    @classmethod
+    def from_env(cls, var: str = "BRH_PROFILE"):
+        value = os.environ.get(var, "")
+        if value in ("", "0"):
+            return cls(None)
+        return cls("profile_trace.json" if value == "1" else value)
+
+    def _record(self, name, start, end):
+        self.events.append((name, start - self.t0, end - start, self.current["cycle"], self.current["class"]))
+
+    @contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter())
+
+    @contextmanager
+    def cycle(self, cycle: int, op_class: str):
+        """attributes everything that happens inside to `cycle`"""
+        self.current = {"cycle": cycle, "class": op_class}
+        try:
+            with self.span("cycle"):
+                yield
+        finally:
+            self.current = {"cycle": None, "class": None}
+
+    def wrap(self, owner, attr: str, name: str):
+        """replaces owner.attr by a timed version of itself"""
+        func = getattr(owner, attr)
+        record = self._record
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter())
+
+        setattr(owner, attr, timed)
+
+    def summary(self) -> str:
+        by_name = defaultdict(lambda: [0, 0.0])
+        by_class = defaultdict(lambda: defaultdict(float))
+        cycles_per_class = defaultdict(set)
+        for name, _, dur, cycle, op_class in self.events:
+            by_name[name][0] += 1
+            by_name[name][1] += dur
+            if op_class is not None:
+                by_class[op_class][name] += dur
+                cycles_per_class[op_class].add(cycle)
+
+        names = sorted(by_name, key=lambda n: -by_name[n][1])
+        lines = [f"{'hot path':<24}{'calls':>10}{'total s':>10}{'mean ms':>10}"]
+        for n in names:
+            count, total = by_name[n]
+            lines.append(f"{n:<24}{count:>10}{total:>10.3f}{1000 * total / count:>10.3f}")
+
+        lines.append("")
+        lines.append(f"{'class':<10}{'cycles':>8}" + "".join(f"{n[:14]:>16}" for n in names) + "   (ms / cycle)")
+        for op_class in sorted(by_class):
+            n_cycles = len(cycles_per_class[op_class])
+            cells = "".join(f"{1000 * by_class[op_class][n] / n_cycles:>16.3f}" for n in names)
+            lines.append(f"{op_class:<10}{n_cycles:>8}{cells}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        return {"traceEvents": [
+            {"name": name, "ph": "X", "pid": 0, "tid": 0,
+             "ts": start * 1e6, "dur": dur * 1e6,
+             "args": {"cycle": cycle, "class": op_class}}
+            for name, start, dur, cycle, op_class in self.events
+        ]}
+
+    def report(self, counters: dict = None):
+        if not self.enabled:
+            return
+        print(self.summary())
+        for name, value in (counters or {}).items():
+            print(f"{name:<24}{value:>10}")
+        with open(self.output, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        print(f"chrome trace written to {self.output}")
@@ -0,0 +1,97 @@
+"""
+Renders the Animation scene in parallel chunks and stitches them back together.
+
+The cycle range is split in K chunks, every chunk is rendered by its own manim
+process (BRH_CYCLE_START / BRH_CYCLE_END), starting from the scene state given
+by the row played right before the chunk (start - BRH_STRIDE), then the
+partial movies are concatenated without re-encoding. The heatmap and statistics
+of every chunk count from the start of the whole range (BRH_RENDER_RANGE), so
+the seams match a single process render.
+
+python render_parallel.py -j 8 --end 300 -- -r 3840,2160 -f 60
+
+everything after `--` goes to manim (don't pass -p). With BRH_TIMELAPSE, loops
+crossing a chunk boundary are compressed on each side independently.
+BRH_PIPELINE renders in a single process: every chunk would fill and drain the
+five stages at its seams, which a serial render doesn't.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tracefile import load_trace
+from traceindex import seek_from_env
+
+HERE = Path(__file__).resolve().parent
+
+
+def chunk_bounds(start: int, stop: int, jobs: int, stride: int = 1) -> list:
+    """splits [start, stop) in at most `jobs` contiguous, non-empty chunks, starting on the stride"""
+    jobs = max(1, min(jobs, -(-(stop - start) // stride)))
+    edges = [start + (stop - start) * k // jobs // stride * stride for k in range(jobs)] + [stop]
+    return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if a < b]
+
+
+def render_chunk(k: int, start: int, stop: int, media_dir: Path, manim_args: list, whole: tuple) -> Path:
+    # the heatmap and statistics count from the start of the whole range, see animation.py
+    env = dict(os.environ, BRH_CYCLE_START=str(start), BRH_CYCLE_END=str(stop),
+               BRH_RENDER_RANGE=f"{whole[0]},{whole[1]}")
+    # the seek was resolved once for the whole range
+    env.pop("BRH_SEEK_PC", None)
+    env.pop("BRH_SEEK_OPCODE", None)
+    name = f"chunk_{k:04d}"
+    cmd = [sys.executable, "-m", "manim", "render", *manim_args,
+           "--media_dir", str(media_dir / name), "-o", name,
+           str(HERE / "animation.py"), "Animation"]
+    subprocess.run(cmd, env=env, cwd=HERE, check=True)
+    return next((media_dir / name).glob(f"videos/**/{name}.*"))
+
+
+def concat(parts: list, output: Path):
+    listing = output.with_suffix(".txt")
+    listing.write_text("".join(f"file '{p.resolve()}'\n" for p in parts))
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                    "-i", str(listing), "-c", "copy", str(output)], check=True)
+    listing.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--start", type=int, default=int(os.environ.get("BRH_CYCLE_START", 1)))
+    parser.add_argument("--end", type=int, default=None, help="default: BRH_MAX_CYCLES rows after the start")
+    parser.add_argument("-o", "--output", type=Path, default=HERE / "media" / "Animation_parallel.mp4")
+    parser.add_argument("manim_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    manim_args = args.manim_args[1:] if args.manim_args[:1] == ["--"] else args.manim_args
+    # the chunks run from this directory: a trace path relative to the caller's cwd has to be made absolute
+    trace_path = Path(os.environ.get("BRH_TRACE", HERE / "trace_data.pkl")).resolve()
+    os.environ["BRH_TRACE"] = str(trace_path)
+    trace = load_trace(trace_path)
+    start = seek_from_env(trace, max(1, args.start))
+    stop = min(args.end or start - 1 + int(os.environ.get("BRH_MAX_CYCLES", 300)), len(trace))
+    jobs = args.jobs
+    if os.environ.get("BRH_PIPELINE", "0") != "0":
+        print("render_parallel.py: BRH_PIPELINE renders in a single process", file=sys.stderr)
+        jobs = 1
+    chunks = chunk_bounds(start, stop, jobs, max(1, int(os.environ.get("BRH_STRIDE", 1))))
+
+    media_dir = HERE / "media" / "chunks"
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        parts = list(pool.map(lambda c: render_chunk(c[0], *c[1], media_dir, manim_args, (start, stop)), enumerate(chunks)))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    if len(parts) == 1:
+        shutil.copy(parts[0], args.output)
+    else:
+        concat(parts, args.output)
+    print(args.output)
+
+
+if __name__ == "__main__":
+    main()
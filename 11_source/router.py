@@ -0,0 +1,178 @@
+"""
+Automatic Manhattan wire router.
+
+Every wire is routed on a grid between its two pin stubs (the points `hgap`
+away from the unit edges) with A*. Unit bounding boxes are obstacles, bends
+cost a little, crossing another wire costs more and running along another wire
+costs a lot, unless both wires leave the same pin (fan-out may share a trunk).
+Wires are routed shortest first, then each one is ripped up and rerouted once
+against all the others to remove crossings the first pass could not foresee.
+
+Routes are cached on disk by a hash of the layout (obstacles + pins + settings),
+so re-rendering an unchanged layout skips routing entirely.
+"""
+import heapq
+
+import numpy as np
+
+from common.cache import cache_dir, content_key, save_npz_atomic
+
+ROUTER_VERSION = 1
+STEP = 0.1                        # grid resolution, in manim units
+BOUNDS = (-7.1, -4.0, 7.1, 4.0)   # frame, x0 y0 x1 y1
+MARGIN = 0.1                      # clearance around units
+BEND, CROSS, OVERLAP = 4.0, 12.0, 60.0
+
+DIRS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class Grid:
+    def __init__(self, obstacles, step=STEP, bounds=BOUNDS, margin=MARGIN):
+        self.step = step
+        self.x0, self.y0 = bounds[0], bounds[1]
+        self.nx = int(round((bounds[2] - bounds[0]) / step)) + 1
+        self.ny = int(round((bounds[3] - bounds[1]) / step)) + 1
+        self.blocked = np.zeros((self.nx, self.ny), dtype=bool)
+        for x0, y0, x1, y1 in obstacles:
+            i0, j0 = self.cell((x0 - margin, y0 - margin), np.ceil)
+            i1, j1 = self.cell((x1 + margin, y1 + margin), np.floor)
+            self.blocked[max(i0, 0):i1 + 1, max(j0, 0):j1 + 1] = True
+
+    def cell(self, point, rounding=np.round):
+        i = int(rounding((point[0] - self.x0) / self.step))
+        j = int(rounding((point[1] - self.y0) / self.step))
+        return min(max(i, 0), self.nx - 1), min(max(j, 0), self.ny - 1)
+
+    def point(self, cell):
+        return np.array([self.x0 + cell[0] * self.step, self.y0 + cell[1] * self.step, 0.0])
+
+
+def _astar(grid, start, goal, usage, group, start_dir=None, goal_dir=None):
+    """
+    cheapest orthogonal cell path start -> goal; usage maps cell -> {group: axis}.
+    The path leaves `start` without doubling back on `start_dir` and never
+    reaches `goal` moving along `goal_dir` (which would double back on the end stub).
+    """
+    def penalty(cell, axis):
+        cost = 0.0
+        for other, other_axis in usage.get(cell, {}).items():
+            if other != group:
+                cost += OVERLAP if other_axis == axis else CROSS
+        return cost
+
+    h = lambda c: abs(c[0] - goal[0]) + abs(c[1] - goal[1])
+    best = {(start, start_dir): 0.0}
+    parent = {}
+    queue = [(h(start), 0.0, start, start_dir)]
+    while queue:
+        _, cost, cell, d = heapq.heappop(queue)
+        if cell == goal and d != goal_dir:
+            path = [cell]
+            state = (cell, d)
+            while state in parent:
+                state = parent[state]
+                path.append(state[0])
+            return path[::-1]
+        if cost > best.get((cell, d), np.inf):
+            continue
+        for nd in DIRS:
+            if d is not None and nd == (-d[0], -d[1]):
+                continue
+            nxt = (cell[0] + nd[0], cell[1] + nd[1])
+            if not (0 <= nxt[0] < grid.nx and 0 <= nxt[1] < grid.ny):
+                continue
+            if grid.blocked[nxt] and nxt != goal:
+                continue
+            if nxt == goal and nd == goal_dir:
+                continue
+            axis = 0 if nd[1] == 0 else 1
+            new = cost + 1.0 + (BEND if d is not None and nd != d else 0.0) + penalty(nxt, axis)
+            if new < best.get((nxt, nd), np.inf):
+                best[(nxt, nd)] = new
+                parent[(nxt, nd)] = (cell, d)
+                heapq.heappush(queue, (new + h(nxt), new, nxt, nd))
+    raise RuntimeError(f"no route from {start} to {goal}")
+
+
+def _mark(usage, path, group, add=True):
+    for a, b in zip(path[:-1], path[1:]):
+        axis = 0 if a[1] == b[1] else 1
+        for cell in (a, b):
+            if add:
+                usage.setdefault(cell, {})[group] = axis
+            else:
+                usage.get(cell, {}).pop(group, None)
+
+
+def _corners(points):
+    """drops the points that sit in the middle of a straight run"""
+    keep = [points[0]]
+    for prev, cur, nxt in zip(points[:-2], points[1:-1], points[2:]):
+        a, b = cur - prev, nxt - cur
+        if abs(a[0] * b[1] - a[1] * b[0]) > 1e-9:
+            keep.append(cur)
+    keep.append(points[-1])
+    return keep
+
+
+def route_all(obstacles: list, pins: list) -> list:
+    """
+    obstacles : (x0, y0, x1, y1) boxes
+    pins      : (start, stub_start, stub_end, end) points of every wire
+    returns the corner points of every wire, in the order of `pins`
+    """
+    grid = Grid(obstacles)
+    cells = [(grid.cell(p[1]), grid.cell(p[2])) for p in pins]
+    # direction of each stub, away from its unit
+    stub_dir = lambda pin, stub: tuple(int(v) for v in np.sign(np.round(np.subtract(stub, pin)[:2], 6)))
+    dirs = [(stub_dir(p[0], p[1]), stub_dir(p[3], p[2])) for p in pins]
+    # wires leaving the same pin may share their trunk
+    groups = [tuple(np.round(p[0], 3)) for p in pins]
+    for a, b in cells:
+        grid.blocked[a] = grid.blocked[b] = False
+
+    usage = {}
+    paths = [None] * len(pins)
+    order = sorted(range(len(pins)), key=lambda k: abs(cells[k][0][0] - cells[k][1][0]) + abs(cells[k][0][1] - cells[k][1][1]))
+    for k in order:
+        paths[k] = _astar(grid, *cells[k], usage, groups[k], *dirs[k])
+        _mark(usage, paths[k], groups[k])
+
+    # rip-up and reroute once, now that every other wire is known
+    for k in order:
+        _mark(usage, paths[k], groups[k], add=False)
+        paths[k] = _astar(grid, *cells[k], usage, groups[k], *dirs[k])
+        _mark(usage, paths[k], groups[k])
+
+    routes = []
+    for (start, stub_start, stub_end, end), path in zip(pins, paths):
+        inner = [grid.point(c) for c in path]
+        # snap the grid path onto the exact stubs, keeping every segment orthogonal
+        inner[0] = np.array(stub_start, dtype=float)
+        inner[-1] = np.array(stub_end, dtype=float)
+        points = [np.array(start, dtype=float)]
+        for p in inner + [np.array(end, dtype=float)]:
+            prev = points[-1]
+            if abs(prev[0] - p[0]) > 1e-9 and abs(prev[1] - p[1]) > 1e-9:
+                points.append(np.array([prev[0], p[1], 0.0]))
+            points.append(p)
+        routes.append(np.array(_corners(points)))
+    return routes
+
+
+def cached_route_all(obstacles: list, pins: list) -> list:
+    """route_all, memoized on disk by a hash of the layout"""
+    layout = (
+        ROUTER_VERSION, STEP, BOUNDS, MARGIN, BEND, CROSS, OVERLAP,
+        [tuple(np.round(b, 4)) for b in obstacles],
+        [tuple(tuple(np.round(p, 4)) for p in pin) for pin in pins],
+    )
+    path = cache_dir("routes") / f"{content_key(layout)}.npz"
+    if path.exists():
+        with np.load(path) as data:
+            return np.split(data["points"], data["offsets"][1:-1])
+
+    routes = route_all(obstacles, pins)
+    offsets = np.cumsum([0] + [len(r) for r in routes])
+    save_npz_atomic(path, points=np.concatenate(routes), offsets=offsets)
+    return routes
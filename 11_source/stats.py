@@ -0,0 +1,122 @@
+"""
+Instruction mix and CPI-like counters of a trace.
+
+Every counter is a prefix sum over the decoded window, so the statistics of
+rows [first, k) are one subtraction away for any k: the overlay (BRH_STATS=1)
+costs the same at every cycle. The export reads the trace once, in chunks,
+without rendering anything.
+
+- mix : instructions per opcode class (decode.py)
+- branches / taken : conditional branches, and the ones taken (next pc != address + 4)
+- stalls / flushes : load-use stalls, and taken control transfers flushing 2
+  slots, as in the five-stage model of pipeline.py
+- cpi : (instructions + stalls + 2 * flushes) / instructions
+
+python stats.py trace_data.trace -o stats.json     # or .csv, or stdout
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from decode import classify, CLASSES
+from pipeline import Schedule
+from tracefile import load_trace
+
+COUNTERS = ("branches", "taken", "stalls", "flushes")
+
+
+class TraceStats:
+    """prefix sums of the counters over a window of rows"""
+
+    def __init__(self, pc, instr):
+        op_class = classify(instr)
+        schedule = Schedule(pc, instr)
+        self.mix = np.zeros((len(op_class) + 1, len(CLASSES)), dtype=np.int64)
+        np.cumsum(op_class[:, None] == np.arange(len(CLASSES)), axis=0, out=self.mix[1:])
+
+        branch = op_class == CLASSES.index("BRANCH")
+        per_row = {"branches": branch, "taken": branch & schedule.taken,
+                   "stalls": schedule.stall, "flushes": schedule.taken}
+        self.counters = {k: np.concatenate(([0], np.cumsum(v, dtype=np.int64))) for k, v in per_row.items()}
+
+    def counts(self, first: int, stop: int) -> dict:
+        """raw counters of rows [first, stop) of the window"""
+        mix = self.mix[stop] - self.mix[first]
+        counts = {"instructions": int(mix.sum()), "mix": dict(zip(CLASSES, map(int, mix)))}
+        counts.update({k: int(v[stop] - v[first]) for k, v in self.counters.items()})
+        return counts
+
+
+def add(a: dict, b: dict) -> dict:
+    total = {k: a[k] + b[k] for k in ("instructions", *COUNTERS)}
+    total["mix"] = {c: a["mix"][c] + b["mix"][c] for c in CLASSES}
+    return total
+
+
+def summary(counts: dict) -> dict:
+    """counters plus the derived ratios"""
+    n = counts["instructions"]
+    return {
+        **counts,
+        "mix_ratio": {c: v / n if n else 0.0 for c, v in counts["mix"].items()},
+        "taken_ratio": counts["taken"] / counts["branches"] if counts["branches"] else 0.0,
+        "cpi": (n + counts["stalls"] + 2 * counts["flushes"]) / n if n else 0.0,
+    }
+
+
+def overlay_lines(stats: dict) -> list:
+    """the lines of the statistics overlay"""
+    lines = [f"instr  {stats['instructions']}",
+             f"CPI    {stats['cpi']:.2f}",
+             f"taken  {stats['taken']}/{stats['branches']}"]
+    return lines + [f"{c:<6} {v}" for c, v in stats["mix"].items() if c != "OTHER" or v]
+
+
+def trace_stats(trace, start: int = 0, stop: int = None, chunk: int = 1 << 20) -> dict:
+    """summary of rows [start, stop) of a trace, read in chunks"""
+    stop = len(trace) if stop is None else min(stop, len(trace))
+    totals = None
+    for a in range(start, stop, chunk):
+        b = min(a + chunk, stop)
+        # one row before the chunk (load-use, address of the first instruction)
+        lo = max(a - 1, 0)
+        part = TraceStats(trace["pc"][lo:b], trace["instr"][lo:b]).counts(a - lo, b - lo)
+        totals = part if totals is None else add(totals, part)
+    return summary(totals or TraceStats([], []).counts(0, 0))
+
+
+def flatten(stats: dict, prefix: str = "") -> list:
+    rows = []
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            rows += flatten(value, f"{prefix}{key}.")
+        else:
+            rows.append((prefix + key, value))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("-o", "--output", type=Path, help=".json or .csv (default: json on stdout)")
+    args = parser.parse_args()
+
+    stats = trace_stats(load_trace(args.trace), args.start, args.end)
+    if args.output is not None and args.output.suffix == ".csv":
+        with open(args.output, "w", newline="") as f:
+            csv.writer(f).writerows([("counter", "value"), *flatten(stats)])
+    elif args.output is not None:
+        args.output.write_text(json.dumps(stats, indent=2))
+    else:
+        json.dump(stats, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+HERE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent))
+from pipeline import Schedule, STAGES
+from tracefile import load_trace
+
+
+@pytest.fixture(scope="module")
+def schedule():
+    trace = load_trace(HERE / "trace_data.pkl")
+    return Schedule(trace["pc"], trace["instr"])
+
+
+def test_every_instruction_goes_through_every_stage_once(schedule):
+    seen = {stage: [] for stage in range(len(STAGES))}
+    for t in range(len(schedule)):
+        for stage, token in enumerate(schedule.occupancy(t)):
+            if not isinstance(token, tuple):
+                seen[stage].append(token)
+    for stage, tokens in seen.items():
+        assert tokens == list(range(len(schedule.execute))), STAGES[stage]
+
+
+def test_set_slots_over_the_trace(schedule):
+    pytest.importorskip("manim")
+    from panels import PipelineView
+
+    view = PipelineView()
+    for t in range(len(schedule)):
+        tokens = schedule.occupancy(t)
+        view.set_slots(tokens, str, animate=False)
+        assert len({id(label) for label in view.labels}) == len(STAGES)
+        for label, slot in zip(view.labels, view.slots):
+            assert np.allclose(label.get_center(), slot.get_center())
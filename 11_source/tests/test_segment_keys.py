@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+HERE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent))
+from tracefile import load_trace
+
+
+def strided_scene(data: dict, shown: int, stride: int):
+    """the state cycle_key reads, labels on row `shown` before playing row shown + stride"""
+    animation = pytest.importorskip("animation")
+    from panels import hex32
+
+    rows = slice(0, shown + 1)
+    scene = SimpleNamespace(
+        data=data, base=shown, shown=shown, labels={"pc": None}, scene_key="scene",
+        active=np.zeros(stride + 1, dtype=np.uint32),
+        registers=SimpleNamespace(values=animation.register_state(data["instr"][rows], data["wb"][rows]),
+                                  cycle=shown),
+    )
+    scene.label_string = lambda column, row: hex32(data[column][row])
+    scene.register_target = lambda cycle: animation.Animation.register_target(scene, cycle)
+    return animation, scene
+
+
+def test_skipped_register_write_changes_the_play_key(monkeypatch):
+    trace = load_trace(HERE / "trace_data.pkl")
+    data = {k: np.array(trace[k]) for k in ("pc", "instr", "wb")}
+    shown, stride = 10, 4
+    # row 11 of the bundled trace is an addi writing x8, skipped by the stride
+    skipped = shown + 1
+    assert data["instr"][skipped] & 0x7F == 0x13 and (data["instr"][skipped] >> 7) & 0x1F
+
+    animation, scene = strided_scene(data, shown, stride)
+    monkeypatch.setattr(animation, "REGISTERS", True)
+    monkeypatch.setattr(animation, "HEATMAP", 0)
+    monkeypatch.setattr(animation, "STATS", False)
+    key = animation.Animation.cycle_key(scene, shown + stride, "play")
+
+    data["wb"][skipped] ^= 1
+    assert animation.Animation.cycle_key(scene, shown + stride, "play") != key
@@ -0,0 +1,196 @@
+"""
+Columnar trace format.
+
+    magic "BRHTRACE" | u32 header length | json header | padding | columns
+
+Every column is a contiguous little-endian uint32 array of `n_cycles` entries,
+so a column (or a window of it) is opened with np.memmap without reading the
+rest of the file. The legacy trace_data.pkl (dict of int lists) is still
+accepted by `load_trace`.
+
+`pc` is the next pc of the row's instruction, the value the PC register holds
+once it retired: its target when it is a taken jump or branch, its address + 4
+otherwise. The address of the instruction of row i is then pc[i-1]
+(ingest.py converts simulator logs giving the address).
+
+convert a pickle:   python tracefile.py trace_data.pkl trace_data.trace
+"""
+import json
+import os
+import pickle
+import shutil
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"BRHTRACE"
+VERSION = 1
+DTYPE = np.dtype("<u4")
+ALIGN = 64
+COLUMNS = ("pc", "instr", "R1", "R2", "imm", "mem", "wb")
+
+
+def to_u32(values) -> np.ndarray:
+    """masks python ints (possibly wider than 32 bits, or negative) down to uint32"""
+    arr = np.asarray(values)
+    if arr.dtype == DTYPE:
+        return arr
+    return (arr.astype(np.int64) & 0xFFFFFFFF).astype(DTYPE)
+
+
+class Trace:
+    """read-only view over a trace, one uint32 array per column"""
+
+    def __init__(self, columns: dict, path=None):
+        self._columns = columns
+        self.path = path
+        self.n_cycles = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def open(cls, path):
+        path = Path(path)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a trace file")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len))
+        if header["version"] != VERSION:
+            raise ValueError(f"{path}: unsupported trace version {header['version']}")
+
+        n = header["n_cycles"]
+        offset = header["data_offset"]
+        columns = {}
+        for name in header["columns"]:
+            # np.memmap refuses empty maps
+            columns[name] = (np.memmap(path, dtype=DTYPE, mode="r", offset=offset, shape=(n,))
+                             if n else np.zeros(0, dtype=DTYPE))
+            offset += n * DTYPE.itemsize
+        trace = cls(columns, path)
+        trace.n_cycles = n
+        return trace
+
+    @classmethod
+    def from_pickle(cls, path):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        return cls({k: to_u32(v) for k, v in data.items()}, path)
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    def __len__(self):
+        return self.n_cycles
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self._columns[name]
+
+    def window(self, start: int, stop: int) -> dict:
+        """copies rows [start, stop) of every column into memory"""
+        return {k: np.array(v[start:stop]) for k, v in self._columns.items()}
+
+
+def load_trace(path) -> Trace:
+    """opens a .trace file lazily, or loads a legacy pickle"""
+    path = Path(path)
+    trace = Trace.from_pickle(path) if path.suffix == ".pkl" else Trace.open(path)
+    missing = [c for c in COLUMNS if c not in trace]
+    if missing:
+        raise ValueError(f"{path} is missing trace columns {missing}")
+    return trace
+
+
+def _header(names, n_cycles) -> bytes:
+    header = {"version": VERSION, "n_cycles": int(n_cycles), "columns": list(names),
+              "dtype": DTYPE.str, "data_offset": 0}
+    # the offset is part of the header, so grow it until it is stable
+    while True:
+        blob = json.dumps(header).encode()
+        start = len(MAGIC) + 4 + len(blob)
+        offset = -(-start // ALIGN) * ALIGN
+        if offset == header["data_offset"]:
+            return MAGIC + struct.pack("<I", len(blob)) + blob + b"\0" * (offset - start)
+        header["data_offset"] = offset
+
+
+def write_trace(path, columns: dict):
+    """writes equally long columns to a .trace file"""
+    arrays = {k: to_u32(v) for k, v in columns.items()}
+    lengths = {len(a) for a in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 0
+
+    with open(path, "wb") as f:
+        f.write(_header(arrays, n))
+        for a in arrays.values():
+            f.write(a.tobytes())
+
+
+class TraceWriter:
+    """
+    Writes a .trace incrementally, chunk after chunk, in constant memory.
+    Columns are spooled to temporary files and assembled behind the header on close.
+
+        with TraceWriter("out.trace") as w:
+            for chunk in chunks:
+                w.write_chunk(chunk)
+    """
+
+    def __init__(self, path, columns=COLUMNS):
+        self.path = Path(path)
+        self.names = tuple(columns)
+        self.n_cycles = 0
+        self.spools = {k: open(self._spool(k), "wb") for k in self.names}
+
+    def _spool(self, name) -> Path:
+        return self.path.with_name(f"{self.path.name}.{name}.{os.getpid()}.tmp")
+
+    def write_chunk(self, columns: dict):
+        arrays = [to_u32(columns[k]) for k in self.names]
+        if len({len(a) for a in arrays}) > 1:
+            raise ValueError("columns of a chunk have different lengths")
+        for name, a in zip(self.names, arrays):
+            self.spools[name].write(a.tobytes())
+        self.n_cycles += len(arrays[0])
+
+    def close(self):
+        for f in self.spools.values():
+            f.close()
+        with open(self.path, "wb") as out:
+            out.write(_header(self.names, self.n_cycles))
+            for name in self.names:
+                with open(self._spool(name), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        self.discard()
+
+    def discard(self):
+        for name, f in self.spools.items():
+            f.close()
+            self._spool(name).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def convert(src, dst):
+    """any readable trace (pickle or .trace) -> .trace"""
+    trace = load_trace(src)
+    write_trace(dst, {k: trace[k] for k in trace.columns})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python tracefile.py <in.pkl|in.trace> <out.trace>")
+    convert(sys.argv[1], sys.argv[2])
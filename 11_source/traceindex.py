@@ -0,0 +1,128 @@
+"""
+Seek index of a trace: the cycles running a given PC, or a given opcode.
+
+Built with one stable argsort per key (PC, 7-bit opcode) and cached under
+.cache/index by the trace's path, size and modification time. Finding the first
+cycle at PC X after some cycle is then a binary search instead of a scan of a
+possibly 10M-cycle trace.
+
+python traceindex.py trace_data.trace     # builds the index ahead of time
+
+BRH_SEEK_PC=0x80000010 / BRH_SEEK_OPCODE=LOAD (a class of decode.py, or an
+opcode like 0x03) move the start of the rendered window to the first matching
+cycle at or after BRH_CYCLE_START.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.cache import cache_dir, content_key, save_npz_atomic
+from decode import CLASS_LUT, CLASSES
+from tracefile import load_trace, Trace
+
+SEEK_PC = os.environ.get("BRH_SEEK_PC")
+SEEK_OPCODE = os.environ.get("BRH_SEEK_OPCODE")
+
+
+class TraceIndex:
+    """PC -> cycles and opcode -> cycles, every cycle list in ascending order"""
+
+    def __init__(self, arrays):
+        self.pc_order = arrays["pc_order"]
+        self.pc_sorted = arrays["pc_sorted"]
+        self.op_order = arrays["op_order"]
+        self.op_starts = arrays["op_starts"]
+
+    @classmethod
+    def build(cls, trace: Trace) -> "TraceIndex":
+        dtype = np.uint32 if len(trace) < 2**32 else np.uint64
+        pc = np.asarray(trace["pc"])
+        pc_order = np.argsort(pc, kind="stable").astype(dtype)
+        opcode = (np.asarray(trace["instr"]) & 0x7F).astype(np.uint8)
+        return cls({
+            "pc_order": pc_order,
+            "pc_sorted": pc[pc_order],
+            "op_order": np.argsort(opcode, kind="stable").astype(dtype),
+            "op_starts": np.concatenate(([0], np.cumsum(np.bincount(opcode, minlength=128)))),
+        })
+
+    @classmethod
+    def load(cls, trace: Trace) -> "TraceIndex":
+        """cached index of a trace, rebuilt when the trace file changed"""
+        stat = os.stat(trace.path)
+        key = content_key(str(Path(trace.path).resolve()), stat.st_size, stat.st_mtime_ns, len(trace))
+        path = cache_dir("index") / f"{key}.npz"
+        if path.exists():
+            with np.load(path) as data:
+                return cls(dict(data))
+        index = cls.build(trace)
+        save_npz_atomic(path, pc_order=index.pc_order, pc_sorted=index.pc_sorted,
+                        op_order=index.op_order, op_starts=index.op_starts)
+        return index
+
+    def cycles_at_pc(self, pc: int) -> np.ndarray:
+        """cycles running the instruction at `pc`: the rows after the ones whose next pc is `pc`"""
+        lo = np.searchsorted(self.pc_sorted, pc, side="left")
+        hi = np.searchsorted(self.pc_sorted, pc, side="right")
+        cycles = self.pc_order[lo:hi] + 1
+        return cycles[cycles < len(self.pc_order)]
+
+    def cycles_of_opcode(self, opcode: int) -> np.ndarray:
+        return self.op_order[self.op_starts[opcode]:self.op_starts[opcode + 1]]
+
+
+def parse_opcodes(value: str) -> list:
+    """7-bit opcodes named by a class of decode.py (LOAD, BRANCH ...) or by a number (0x03)"""
+    if value.upper() in CLASSES:
+        # OTHER covers every opcode outside the decoded subset
+        return [int(op) for op in np.flatnonzero(CLASS_LUT == CLASSES.index(value.upper()))]
+    return [int(value, 0) & 0x7F]
+
+
+def seek(trace: Trace, start: int, pc=None, opcode=None) -> int:
+    """first cycle >= start running `pc` and / or one of the opcodes named by `opcode`"""
+    index = TraceIndex.load(trace)
+    opcodes = parse_opcodes(opcode) if opcode is not None else None
+    if pc is not None:
+        cycles = index.cycles_at_pc(int(pc, 0) if isinstance(pc, str) else pc)
+        if opcodes is not None:
+            cycles = cycles[np.isin(np.asarray(trace["instr"])[cycles] & 0x7F, opcodes)]
+    elif opcodes is not None:
+        cycles = np.sort(np.concatenate([index.cycles_of_opcode(op) for op in opcodes]))
+    else:
+        return start
+
+    k = np.searchsorted(cycles, start)
+    if k == len(cycles):
+        raise ValueError(f"no cycle >= {start} with pc={pc} opcode={opcode} in {trace.path}")
+    return int(cycles[k])
+
+
+def seek_from_env(trace: Trace, start: int) -> int:
+    """`start` moved by BRH_SEEK_PC / BRH_SEEK_OPCODE, if set"""
+    if SEEK_PC is None and SEEK_OPCODE is None:
+        return start
+    return seek(trace, start, SEEK_PC, SEEK_OPCODE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--pc", help="print the cycles running this pc")
+    parser.add_argument("--opcode", help="print the cycles running this opcode / class")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace)
+    index = TraceIndex.load(trace)
+    if args.pc is not None:
+        print(*index.cycles_at_pc(int(args.pc, 0)))
+    if args.opcode is not None:
+        print(*np.sort(np.concatenate([index.cycles_of_opcode(op) for op in parse_opcodes(args.opcode)])))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,18 @@
 from manim import *
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.text_cache import cached_text
+import common.components as components
+from common.components import CLASSIC
+
+# one LaggedStart per unit / wire group instead of one play call per element.
+# lag_ratio=1 keeps the original rhythm (one element per second), lower overlaps them
+BATCHED = os.environ.get("BRH_BATCHED", "1") != "0"
+LAG_RATIO = float(os.environ.get("BRH_LAG_RATIO", 1.0))
+
 # This is a very simplyfied single cycle core scheme
 # animated using manim.
 # This one does not invole an LLM as I wanted it to fit my explaination part.
@@ -8,63 +22,21 @@ from manim import *
 class Explanation(Scene):
     def construct(self):
         def create_mux(scene: Scene, position: list) -> VGroup:
-            # mux shape
-            mux_shape = Polygon(
-                [-0.25, 0.4, 0],
-                [0.15, 0.2, 0],
-                [0.15, -0.2, 0],
-                [-0.25, -0.4, 0],
-                fill_color=GRAY, fill_opacity=0.2, color=GRAY
-            ).shift(position)
-            mux_label = Text("MUX", font_size=8).rotate(
-                PI/2).next_to([mux_shape.get_x(), mux_shape.get_y(), mux_shape.get_z()]).shift([-0.25, 0, 0])
-            mux = VGroup(mux_shape, mux_label)
-            return mux
+            return components.create_mux(position, GRAY, style=CLASSIC)
 
         def create_logic_unit(scene: Scene, size: float, position: list, color: ManimColor, inputs: list, outputs: list, clock: bool = False, title: str = "", inverted=False) -> VGroup:
-            if not inverted:
-                w, h = 2*size, 5*size
-            else:
-                h, w = 2*size, 5*size
-
-            box = Rectangle(width=w, height=h, color=color,
-                            fill_color=color, fill_opacity=0.2)
-
-            vg = VGroup()
-            vg.add(box)
-
-            n_in, n_out = len(inputs), len(outputs)
-
-            for i, input in enumerate(inputs):
-                text = Text(input, font_size=8, color=WHITE)
-                text.next_to(box, LEFT, buff=-(text.width+0.1))
-                text.shift([0, (h/2)-((i+1)*(h/(n_in+1))), 0])
-                vg.add(text)
-
-            for i, output in enumerate(outputs):
-                text = Text(output, font_size=8, color=WHITE)
-                text.next_to(box, RIGHT, buff=-(text.width+0.1))
-                text.shift([0, (h/2)-((i+1)*(h/(n_out+1))), 0])
-                vg.add(text)
-
-            if clock:
-                text = Text("clock", font_size=8, color=WHITE)
-                text.shift([-text.width/2, 0, 0])
-                text.next_to(box, UP, buff=-(text.height+0.1))
-                vg.add(text)
-
-            if not title == "":
-                text = Text(title, font_size=8, color=WHITE)
-                text.next_to(box, DOWN)
-                text.shift([0, 0.5, 0])
-                vg.add(text)
-
-            vg.move_to(position)
+            vg = components.create_logic_unit(size, position, color, inputs, outputs, clock, title, inverted, style=CLASSIC)
+            create_in_sequence(scene, *vg)
+            return vg
 
-            for element in vg:
-                scene.play(Create(element))
+        def create_in_sequence(scene: Scene, *mobjects):
+            """Create each mobject after the previous one, in a single play call when BATCHED"""
+            if BATCHED:
+                scene.play(LaggedStart(*[Create(m) for m in mobjects], lag_ratio=LAG_RATIO))
+            else:
+                for m in mobjects:
+                    scene.play(Create(m))
 
-            return vg
         # Set dark background
         self.camera.background_color = "#2B2B2B"
 
@@ -110,13 +82,13 @@ class Explanation(Scene):
         for i in range(5):
             self.remove(pc_text, i_text)
             # Chage PC
-            pc_text = Text(hex(i*4), font_size=8, color=WHITE)
+            pc_text = cached_text(hex(i*4), font_size=8, color=WHITE)
             pc_text.next_to(l, LEFT),
             pc_text.shift([1, pc_text.height * 1.5, 0])
             self.add(pc_text)
 
             # Change instruction
-            i_text = Text(program[i], font_size=8, color=WHITE)
+            i_text = cached_text(program[i], font_size=8, color=WHITE)
             i_text.next_to(i_mem[0], RIGHT),
             i_text.shift([0, 0, 0])
             self.add(i_text)
@@ -144,7 +116,6 @@ class Explanation(Scene):
         lines = VGroup()
 
         l_i = Line(i_mem.get_edge_center(RIGHT), control.get_edge_center(LEFT))
-        self.play(Create(l_i))
 
         for i, out in enumerate(control[2:-1]):
             p1 = out.get_edge_center(RIGHT) + [0.1, 0, 0]
@@ -152,7 +123,7 @@ class Explanation(Scene):
             l = DashedLine(p1, p2)
             lines.add(l)
 
-        self.play(Create(lines))
+        create_in_sequence(self, l_i, lines)
 
         self.wait(2)
 
@@ -188,9 +159,6 @@ class Explanation(Scene):
         p = i_mem.get_edge_center(RIGHT)
         l1 = Line(p, [-0.7, p[1], 0])
 
-        self.play(Create(demux))
-        self.play(Create(l1))
-
         lines = VGroup()
         p = control.get_edge_center(LEFT)  # control wire
         l = Line([-0.7, p[1], 0], p)
@@ -207,7 +175,7 @@ class Explanation(Scene):
 
         decode_stage.add(lines, l1, demux)
 
-        self.play(Create(lines))
+        create_in_sequence(self, demux, l1, lines)
 
         self.play(fetch_stage.animate.shift([-1.5, 0, 0]),
                   decode_stage.animate.shift([-1.5, 0, 0]))
@@ -232,8 +200,6 @@ class Explanation(Scene):
 
         alu = VGroup(alu_shape, alu_label)
 
-        self.play(Create(alu))
-
         # add mux and wires
         mux = create_mux(self, [1.25, -1.25, 0])
 
@@ -265,8 +231,7 @@ class Explanation(Scene):
         lines.add(l2)
         lines.add(l3)
 
-        self.play(Create(mux))
-        self.play(Create(lines))
+        create_in_sequence(self, alu, mux, lines)
 
         # ======================
         # DATA MEMORY
@@ -285,7 +250,6 @@ class Explanation(Scene):
         l3 = Line(p3, p4)
 
         addr_wire = VGroup(l1, l2, l3)
-        self.play(Create(addr_wire))
 
         # data coming from register : store
 
@@ -302,7 +266,6 @@ class Explanation(Scene):
             0.05, WHITE, fill_color=WHITE, fill_opacity=1).move_to(p1)
 
         d_in_wire = VGroup(connection_circle, l1, l2, l3, l4)
-        self.play(Create(d_in_wire))
 
         # or read !
 
@@ -319,13 +282,12 @@ class Explanation(Scene):
         l5 = Line(p5, p6)
 
         wb_wire = VGroup(l1, l2, l3, l4, l5)
-        self.play(Create(wb_wire))
+        create_in_sequence(self, addr_wire, d_in_wire, wb_wire)
 
         # or write back !
         self.play(Uncreate(wb_wire[0]), Uncreate(wb_wire[1]))
 
         mux = create_mux(self, [6, 0, 0])
-        self.play(Create(mux))
 
         p1 = addr_wire[1].get_end()  # alu to mux wires
         p2 = p1 + [0, 1.5, 0]
@@ -339,12 +301,10 @@ class Explanation(Scene):
         connection_circle = Circle(
             0.05, WHITE, fill_color=WHITE, fill_opacity=1).move_to(p1)
         alu_mux_wire = VGroup(connection_circle, l1, l2, l3, l4)
-        self.play(Create(alu_mux_wire))
 
         p1 = d_mem[4].get_edge_center(RIGHT) + [0.1, 0, 0]  # dmem to mux wires
         p2 = [mux.get_edge_center(LEFT)[0], p1[1], 0]
         dmem_mux_wire = Line(p1, p2)
-        self.play(Create(dmem_mux_wire))
 
         p1 = mux.get_edge_center(RIGHT)  # mux to wb wires
         p2 = p1 + [0.3, 0, 0]
@@ -355,6 +315,6 @@ class Explanation(Scene):
         l2 = Line(p2, p3)
         l3 = Line(p3, p4)
         mux_wb_wires = VGroup(l1, l2, l3)
-        self.play(Create(mux_wb_wires))
+        create_in_sequence(self, mux, alu_mux_wire, dmem_mux_wire, mux_wb_wires)
 
         self.wait(2)
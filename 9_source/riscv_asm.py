@@ -0,0 +1,134 @@
+# Tiny RV32I assembler used by riscv_encoding.py to show how any instruction is encoded.
+import re
+
+ABI = ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1"] + \
+      [f"a{i}" for i in range(8)] + [f"s{i}" for i in range(2, 12)] + [f"t{i}" for i in range(3, 7)]
+
+# mnemonic -> (format, opcode, funct3, funct7)
+OPS = {
+    "add": ("R", 0x33, 0, 0x00), "sub": ("R", 0x33, 0, 0x20), "sll": ("R", 0x33, 1, 0x00),
+    "slt": ("R", 0x33, 2, 0x00), "sltu": ("R", 0x33, 3, 0x00), "xor": ("R", 0x33, 4, 0x00),
+    "srl": ("R", 0x33, 5, 0x00), "sra": ("R", 0x33, 5, 0x20), "or": ("R", 0x33, 6, 0x00),
+    "and": ("R", 0x33, 7, 0x00),
+    "addi": ("I", 0x13, 0, None), "slti": ("I", 0x13, 2, None), "sltiu": ("I", 0x13, 3, None),
+    "xori": ("I", 0x13, 4, None), "ori": ("I", 0x13, 6, None), "andi": ("I", 0x13, 7, None),
+    "slli": ("I", 0x13, 1, 0x00), "srli": ("I", 0x13, 5, 0x00), "srai": ("I", 0x13, 5, 0x20),
+    "lb": ("I", 0x03, 0, None), "lh": ("I", 0x03, 1, None), "lw": ("I", 0x03, 2, None),
+    "lbu": ("I", 0x03, 4, None), "lhu": ("I", 0x03, 5, None),
+    "jalr": ("I", 0x67, 0, None),
+    "sb": ("S", 0x23, 0, None), "sh": ("S", 0x23, 1, None), "sw": ("S", 0x23, 2, None),
+    "beq": ("B", 0x63, 0, None), "bne": ("B", 0x63, 1, None), "blt": ("B", 0x63, 4, None),
+    "bge": ("B", 0x63, 5, None), "bltu": ("B", 0x63, 6, None), "bgeu": ("B", 0x63, 7, None),
+    "lui": ("U", 0x37, None, None), "auipc": ("U", 0x17, None, None),
+    "jal": ("J", 0x6F, None, None),
+}
+
+# format -> fields as (name, first bit, last bit + 1, assembly part it comes from),
+# bit 0 being the MSB of the binary string
+FIELDS = {
+    "R": [("funct7", 0, 7, None), ("rs2", 7, 12, "rs2"), ("rs1", 12, 17, "rs1"),
+          ("funct3", 17, 20, "op"), ("rd", 20, 25, "rd"), ("opcode", 25, 32, "op")],
+    "I": [("imm[11:0]", 0, 12, "imm"), ("rs1", 12, 17, "rs1"),
+          ("funct3", 17, 20, "op"), ("rd", 20, 25, "rd"), ("opcode", 25, 32, "op")],
+    "S": [("imm[11:5]", 0, 7, "imm"), ("rs2", 7, 12, "rs2"), ("rs1", 12, 17, "rs1"),
+          ("funct3", 17, 20, "op"), ("imm[4:0]", 20, 25, "imm"), ("opcode", 25, 32, "op")],
+    "B": [("imm[12|10:5]", 0, 7, "imm"), ("rs2", 7, 12, "rs2"), ("rs1", 12, 17, "rs1"),
+          ("funct3", 17, 20, "op"), ("imm[4:1|11]", 20, 25, "imm"), ("opcode", 25, 32, "op")],
+    "U": [("imm[31:12]", 0, 20, "imm"), ("rd", 20, 25, "rd"), ("opcode", 25, 32, "op")],
+    "J": [("imm[20|10:1|11|19:12]", 0, 20, "imm"), ("rd", 20, 25, "rd"), ("opcode", 25, 32, "op")],
+}
+
+# operand syntax of every format, in assembly order
+SYNTAX = {
+    "R": ["rd", "rs1", "rs2"],
+    "I": ["rd", "rs1", "imm"],
+    "load": ["rd", "imm(rs1)"],
+    "S": ["rs2", "imm(rs1)"],
+    "B": ["rs1", "rs2", "imm"],
+    "U": ["rd", "imm"],
+    "J": ["rd", "imm"],
+}
+
+
+def register(name: str) -> int:
+    name = name.strip()
+    if re.fullmatch(r"x([0-9]|[12][0-9]|3[01])", name):
+        return int(name[1:])
+    if name == "fp":
+        return 8
+    if name in ABI:
+        return ABI.index(name)
+    raise ValueError(f"unknown register {name!r}")
+
+
+def _check(value: int, bits: int, signed=True, align=1):
+    lo, hi = (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if signed else (0, (1 << bits) - 1)
+    if not lo <= value <= hi or value % align:
+        raise ValueError(f"immediate {value} does not fit in {bits} bits (aligned on {align})")
+
+
+def assemble(line: str) -> dict:
+    """
+    Encodes one instruction, e.g. "lw x18, 0x8(x3)". Returns
+        word     : the 32 bit encoding
+        format   : R / I / S / B / U / J
+        fields   : FIELDS of the format
+        parts    : assembly parts in order, as (role, text); role is op/rd/rs1/rs2/imm or None for punctuation
+    """
+    m = re.fullmatch(r"\s*([a-z]+)\s*(.*?)\s*", line)
+    op = m.group(1) if m else line
+    if op not in OPS:
+        raise ValueError(f"unsupported instruction {op!r}")
+    fmt, opcode, funct3, funct7 = OPS[op]
+    operands = [o.strip() for o in re.split(r"[,\s]+(?![^(]*\))", m.group(2)) if o.strip()]
+    syntax = SYNTAX["load" if opcode in (0x03, 0x67) and "(" in m.group(2) else fmt]
+    if len(operands) != len(syntax):
+        raise ValueError(f"{op} expects {', '.join(syntax)}")
+
+    regs, imm = {"rd": 0, "rs1": 0, "rs2": 0}, 0
+    parts = [("op", op)]
+    for role, text in zip(syntax, operands):
+        parts.append((None, ", "))
+        if role == "imm(rs1)":
+            mm = re.fullmatch(r"(.*)\((.*)\)", text)
+            if mm is None:
+                raise ValueError(f"expected offset(register), got {text!r}")
+            imm, regs["rs1"] = int(mm.group(1) or "0", 0), register(mm.group(2))
+            parts += [("imm", mm.group(1) or "0"), (None, "("), ("rs1", mm.group(2)), (None, ")")]
+        elif role == "imm":
+            imm = int(text, 0)
+            parts.append(("imm", text))
+        else:
+            regs[role] = register(text)
+            parts.append((role, text))
+
+    rd, rs1, rs2 = regs["rd"] << 7, regs["rs1"] << 15, regs["rs2"] << 20
+    if fmt == "R":
+        word = funct7 << 25 | rs2 | rs1 | funct3 << 12 | rd | opcode
+    elif fmt == "I":
+        if funct7 is not None:  # shifts: shamt + funct7 in the immediate
+            _check(imm, 5, signed=False)
+            imm |= funct7 << 5
+        else:
+            _check(imm, 12)
+        word = (imm & 0xFFF) << 20 | rs1 | funct3 << 12 | rd | opcode
+    elif fmt == "S":
+        _check(imm, 12)
+        word = ((imm >> 5) & 0x7F) << 25 | rs2 | rs1 | funct3 << 12 | (imm & 0x1F) << 7 | opcode
+    elif fmt == "B":
+        _check(imm, 13, align=2)
+        word = (((imm >> 12) & 1) << 31 | ((imm >> 5) & 0x3F) << 25 | rs2 | rs1 | funct3 << 12
+                | ((imm >> 1) & 0xF) << 8 | ((imm >> 11) & 1) << 7 | opcode)
+    elif fmt == "U":
+        _check(imm, 20, signed=False)
+        word = imm << 12 | rd | opcode
+    else:  # J
+        _check(imm, 21, align=2)
+        word = (((imm >> 20) & 1) << 31 | ((imm >> 1) & 0x3FF) << 21 | ((imm >> 11) & 1) << 20
+                | ((imm >> 12) & 0xFF) << 12 | rd | opcode)
+
+    fields = FIELDS[fmt]
+    if fmt == "R" and funct7:
+        # funct7 is what tells sub/sra apart from add/srl
+        fields = [("funct7", 0, 7, "op")] + fields[1:]
+    return {"word": word, "format": fmt, "fields": fields, "parts": parts}
@@ -1,8 +1,42 @@
 from manim import *
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.text_cache import cached_text
+from riscv_asm import assemble
 # this has been llm generated, thus it is more or less bad.
 # The result is nontheless pretty good even though some stuff is to correct
 # TODO : align comas, better arrows
 
+# instructions shown one after the other in a single render. BRH_INSTRUCTIONS
+# overrides them with a ";" separated list, or a file with one instruction per line
+INSTRUCTIONS = ["add x1, x2, x3"]
+
+
+def load_instructions() -> list:
+    value = os.environ.get("BRH_INSTRUCTIONS")
+    if not value:
+        return INSTRUCTIONS
+    if os.path.isfile(value):
+        lines = Path(value).read_text().splitlines()
+    else:
+        lines = value.split(";")
+    lines = [line.split("#")[0].strip() for line in lines]
+    return [line for line in lines if line]
+
+
+field_colors = {
+    "funct7": "#FF6B6B",  # Red
+    "rs2": "#4ECDC4",     # Turquoise
+    "rs1": "#45B7D1",     # Light blue
+    "funct3": "#96CEB4",  # Green
+    "rd": "#FFEEAD",      # Yellow
+    "opcode": "#D4A5A5",  # Pink
+    "imm": "#B39DDB"      # Purple
+}
+
 
 class RISCVEncoding(Scene):
     def construct(self):
@@ -12,71 +46,42 @@ class RISCVEncoding(Scene):
         # Center everything on screen
         self.camera.frame_center = ORIGIN
 
+        instructions = [assemble(line) for line in load_instructions()]
+        self.introduce(instructions[0])
+        for instruction in instructions[1:]:
+            self.morph_to(instruction)
+
+    def layout(self, instruction: dict) -> dict:
+        """builds (without animating) every mobject showing one encoded instruction"""
         # Create the assembly instruction with highlighted parts
-        asm_parts = {
-            "op": Text("add", font_size=36),
-            "rd": Text("x1", font_size=36),
-            "rs1": Text("x2", font_size=36),
-            "rs2": Text("x3", font_size=36)
-        }
+        asm_parts = {}
+        asm_group = VGroup()
+        for role, text in instruction["parts"]:
+            part = cached_text(text, font_size=36)
+            if role:
+                asm_parts[role] = part
+            asm_group.add(part)
 
         # Arrange assembly parts with commas and spaces
-        asm_group = VGroup(
-            asm_parts["op"],
-            Text(", ", font_size=36),
-            asm_parts["rd"],
-            Text(", ", font_size=36),
-            asm_parts["rs1"],
-            Text(", ", font_size=36),
-            asm_parts["rs2"]
-        ).arrange(RIGHT, buff=0.2)
-
+        asm_group.arrange(RIGHT, buff=0.2)
         asm_group.to_edge(UP, buff=1)
 
         # Create binary representation
-        binary = "00000000001100010000000010110011"
-
-        # Create colored boxes for different instruction fields
-        boxes = VGroup()
-        field_colors = {
-            "funct7": "#FF6B6B",  # Red
-            "rs2": "#4ECDC4",     # Turquoise
-            "rs1": "#45B7D1",     # Light blue
-            "funct3": "#96CEB4",  # Green
-            "rd": "#FFEEAD",      # Yellow
-            "opcode": "#D4A5A5"   # Pink
-        }
-
-        # Field positions and widths
-        fields = [
-            ("funct7", 0, 7, None),
-            ("rs2", 7, 12, "rs2"),
-            ("rs1", 12, 17, "rs1"),
-            ("funct3", 17, 20, "op"),  # Link funct3 to "add"
-            ("rd", 20, 25, "rd"),
-            ("opcode", 25, 32, "op")   # Link opcode to "add"
-        ]
+        binary = f"{instruction['word']:032b}"
 
         # Calculate total width to center everything
         total_width = len(binary) * 0.25
         start_x = -total_width/2
 
-        # Play the assembly instruction animation
-        self.play(Write(asm_group))
-        self.wait(1)
-
-        # Create and animate each field
-        all_elements = VGroup()
-        arrows = VGroup()
-        field_boxes = {}  # Store boxes for arrow references
-
-        for field_name, start, end, asm_link in fields:
+        fields = []
+        arrows = []
+        for field_name, start, end, asm_link in instruction["fields"]:
             # Create field box
             field_width = (end - start) * 0.25
             field_box = Rectangle(
                 width=field_width,
                 height=0.5,
-                fill_color=field_colors[field_name],
+                fill_color=field_colors[field_name.split("[")[0]],
                 fill_opacity=0.7,
                 stroke_color=WHITE
             )
@@ -86,19 +91,17 @@ class RISCVEncoding(Scene):
                 np.array([start_x + (start + (end-start)/2) * 0.25, 0, 0])
             )
 
-            # Store box reference
-            field_boxes[field_name] = field_box
-
             # Create field label
-            label = Text(field_name, font_size=20)
+            label = cached_text(field_name, font_size=20)
             label.next_to(field_box, DOWN, buff=0.2)
 
             # Create binary text for this field
-            field_binary = binary[start:end]
-            binary_field = Text(field_binary, font_size=20)
+            binary_field = cached_text(binary[start:end], font_size=20)
             binary_field.move_to(field_box)
+            fields.append(VGroup(field_box, label, binary_field))
 
             # Create straight arrow if this field links to assembly
+            arrow = None
             if asm_link:
                 start_point = field_box.get_top()
                 end_point = asm_parts[asm_link].get_bottom()
@@ -112,8 +115,33 @@ class RISCVEncoding(Scene):
                     max_tip_length_to_length_ratio=0.15,
                     color=WHITE
                 )
-                arrows.add(arrow)
+            arrows.append(arrow)
+
+        # Show complete binary at the bottom
+        final_binary = cached_text(binary, font_size=36, color=WHITE)
+        final_binary.next_to(VGroup(*fields), DOWN, buff=1)
+
+        # Add explanation text
+        explanation = cached_text(
+            f"({instruction['parts'][0][1]} instruction example : 32bits RISC-V)",
+            font_size=24,
+            color=WHITE
+        )
+        explanation.next_to(final_binary, DOWN, buff=0.3)
+
+        return {"asm": asm_group, "fields": fields, "arrows": arrows,
+                "binary": final_binary, "explanation": explanation}
+
+    def introduce(self, instruction: dict):
+        """first instruction : written field by field"""
+        target = self.layout(instruction)
+
+        # Play the assembly instruction animation
+        self.play(Write(target["asm"]))
+        self.wait(1)
 
+        # Create and animate each field
+        for (field_box, label, binary_field), arrow in zip(target["fields"], target["arrows"]):
             # Animate appearance
             self.play(
                 Create(field_box),
@@ -122,29 +150,51 @@ class RISCVEncoding(Scene):
                 run_time=0.5
             )
 
-            if asm_link:
+            if arrow:
                 self.play(Create(arrow), run_time=0.5)
 
-            all_elements.add(field_box, label, binary_field)
+        self.play(Write(target["binary"]))
+        self.play(Write(target["explanation"]))
 
-        # Show complete binary at the bottom
-        final_binary = Text(binary, font_size=36, color=WHITE)
-        final_binary.next_to(all_elements, DOWN, buff=1)
+        # Final positioning adjustments
+        self.shown = target
+        self.entire_scene(target).move_to(ORIGIN)
 
-        self.play(Write(final_binary))
+        self.wait(2)
 
-        # Add explanation text
-        explanation = Text(
-            "(add instruction example : 32bits RISC-V)",
-            font_size=24,
-            color=WHITE
+    def morph_to(self, instruction: dict):
+        """next instructions : the boxes, labels and texts on screen are morphed in place"""
+        target = self.layout(instruction)
+        self.entire_scene(target).move_to(ORIGIN)
+        shown = self.shown
+
+        old_arrows = [arrow for arrow in shown["arrows"] if arrow]
+        self.play(
+            Transform(shown["asm"], target["asm"]),
+            *[FadeOut(arrow) for arrow in old_arrows],
+            run_time=0.5
         )
-        explanation.next_to(final_binary, DOWN, buff=0.3)
-        self.play(Write(explanation))
 
-        # Final positioning adjustments
-        entire_scene = VGroup(asm_group, all_elements,
-                              arrows, final_binary, explanation)
-        entire_scene.move_to(ORIGIN)
+        # reuse one on-screen field per target field, extra ones are created / removed
+        kept = min(len(shown["fields"]), len(target["fields"]))
+        self.play(
+            *[Transform(field, new) for field, new in zip(shown["fields"], target["fields"])],
+            *[FadeIn(new) for new in target["fields"][kept:]],
+            *[FadeOut(field) for field in shown["fields"][kept:]],
+            Transform(shown["binary"], target["binary"]),
+            Transform(shown["explanation"], target["explanation"]),
+        )
+        shown["fields"] = shown["fields"][:kept] + target["fields"][kept:]
+
+        shown["arrows"] = target["arrows"]
+        new_arrows = [arrow for arrow in shown["arrows"] if arrow]
+        if new_arrows:
+            self.play(LaggedStart(*[Create(arrow) for arrow in new_arrows], lag_ratio=0.3))
 
         self.wait(2)
+
+    @staticmethod
+    def entire_scene(target: dict) -> VGroup:
+        return VGroup(target["asm"], *target["fields"],
+                      *[arrow for arrow in target["arrows"] if arrow],
+                      target["binary"], target["explanation"])
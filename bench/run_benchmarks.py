@@ -0,0 +1,187 @@
+"""
+Benchmarks for every scene of the repo.
+
+Each case runs in two fresh python processes, one building the scene with
+animations skipped and one rendering it, so each is timed with clean caches in
+memory (with --cold, each also gets its own empty on-disk cache). Renders at a
+fixed low resolution and reports: construct time, render wall time, frames,
+frames/s, peak RSS and number of mobjects created (both of the render process).
+
+python bench/run_benchmarks.py -o results.json
+python bench/run_benchmarks.py --only Animation-300 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+WIDTH, HEIGHT, FPS = 320, 180, 15
+
+# name -> (scene file, scene class, extra environment)
+CASES = {
+    "Explanation": ("9_source/explanation.py", "Explanation", {}),
+    "TransistorToAdder": ("9_source/transistor_to_adder.py", "TransistorToAdder", {}),
+    "RISCVEncoding": ("9_source/riscv_encoding.py", "RISCVEncoding", {}),
+    **{
+        f"Animation-{n}": ("11_source/animation.py", "Animation", {"BRH_MAX_CYCLES": str(n)})
+        for n in (50, 300, 5000)
+    },
+}
+
+
+def long_trace(n_cycles: int, path: Path) -> Path:
+    """repeats the bundled trace until it is `n_cycles` long"""
+    sys.path.insert(0, str(REPO_ROOT / "11_source"))
+    import numpy as np
+    from tracefile import load_trace, write_trace
+
+    trace = load_trace(REPO_ROOT / "11_source" / "trace_data.pkl")
+    reps = -(-n_cycles // len(trace))
+    write_trace(path, {k: np.tile(trace[k], reps)[:n_cycles] for k in trace.columns})
+    return path
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def measure(scene_file: str, scene_name: str, phase: str) -> dict:
+    """runs inside a child process, `phase` being construct or render"""
+    import importlib.util
+
+    from manim import Mobject, tempconfig
+
+    path = REPO_ROOT / scene_file
+    os.chdir(path.parent)
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    scene_cls = getattr(module, scene_name)
+
+    created = [0]
+    mobject_init = Mobject.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[0] += 1
+        mobject_init(self, *args, **kwargs)
+
+    media_dir = tempfile.mkdtemp(prefix="brh_bench_")
+    settings = {
+        "pixel_width": WIDTH, "pixel_height": HEIGHT, "frame_rate": FPS,
+        "media_dir": media_dir, "disable_caching": True,
+        "verbosity": "WARNING", "progress_bar": "none", "preview": False,
+    }
+
+    with tempconfig(settings):
+        if phase == "construct":
+            t0 = time.perf_counter()
+            scene_cls(skip_animations=True).render()
+            return {"construct_s": time.perf_counter() - t0}
+
+        Mobject.__init__ = counting_init
+        try:
+            scene = scene_cls()
+            t0 = time.perf_counter()
+            scene.render()
+            render_s = time.perf_counter() - t0
+        finally:
+            Mobject.__init__ = mobject_init
+        frames = round(scene.renderer.time * FPS)
+
+    return {
+        "render_s": render_s,
+        "frames": frames,
+        "fps": frames / render_s if render_s else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "mobjects": created[0],
+    }
+
+
+def run_case(name: str, workdir: Path, cold: bool = False) -> dict:
+    scene_file, scene_name, env = CASES[name]
+    env = dict(os.environ, **env)
+    n = int(env.get("BRH_MAX_CYCLES", 0))
+    if n > 1000:  # longer than the bundled trace
+        env["BRH_TRACE"] = str(long_trace(n, workdir / f"trace_{n}.trace"))
+
+    result = {"name": name}
+    for phase in ("construct", "render"):
+        if cold:
+            env["BRH_CACHE_DIR"] = str(workdir / "cache" / f"{name}-{phase}")
+        out = subprocess.run([sys.executable, __file__, "--child", scene_file, scene_name, phase],
+                             env=env, check=True, capture_output=True, text=True)
+        result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def compare(results: list, baseline: dict, threshold: float) -> bool:
+    """prints the ratio to the baseline, returns False if anything got slower than `threshold`"""
+    old = {r["name"]: r for r in baseline["results"]}
+    ok = True
+    print(f"\n{'case':<20}{'render_s':>10}{'baseline':>10}{'ratio':>8}")
+    for r in results:
+        if r["name"] not in old:
+            continue
+        ratio = r["render_s"] / old[r["name"]]["render_s"]
+        flag = "  SLOWER" if ratio > threshold else ""
+        ok &= ratio <= threshold
+        print(f"{r['name']:<20}{r['render_s']:>10.2f}{old[r['name']]['render_s']:>10.2f}{ratio:>8.2f}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", choices=CASES, help="cases to run (default: all)")
+    parser.add_argument("-o", "--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="JSON file of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="max render time ratio vs baseline")
+    parser.add_argument("--cold", action="store_true", help="use an empty on-disk cache")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="brh_bench_") as tmp:
+        results = []
+        for name in args.only or CASES:
+            r = run_case(name, Path(tmp), args.cold)
+            print(f"{name:<20} construct {r['construct_s']:7.2f}s  render {r['render_s']:7.2f}s  "
+                  f"{r['frames']:6d} frames  {r['fps']:6.1f} fps  {r['peak_rss_mb']:7.1f} MB  "
+                  f"{r['mobjects']:7d} mobjects")
+            results.append(r)
+
+    from manim import __version__ as manim_version
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "manim": manim_version,
+            "resolution": [WIDTH, HEIGHT],
+            "fps": FPS,
+            "cold_cache": args.cold,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.baseline and not compare(results, json.loads(args.baseline.read_text()), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# helpers shared by the scenes of every video (9_source, 11_source, ...)
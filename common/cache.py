@@ -0,0 +1,34 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# every on-disk cache lives under one root so a single `rm -rf .cache` resets everything
+CACHE_ROOT = Path(os.environ.get("BRH_CACHE_DIR", REPO_ROOT / ".cache"))
+
+
+def cache_dir(name: str) -> Path:
+    """returns (and creates) the cache sub-directory `name`"""
+    path = CACHE_ROOT / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def content_key(*parts) -> str:
+    """stable hex digest of any repr-able parts"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def save_npz_atomic(path: Path, **arrays):
+    """writes an .npz so that concurrent renders never read a half written file"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
@@ -0,0 +1,150 @@
+"""
+Datapath components shared by every scene (logic units, ALUs, muxes).
+
+Each distinct shape is laid out once, at the origin, as a prototype; every
+unit after that is a copy of the prototype moved into place. Scenes with many
+identical units (register banks, harts, pipeline stages) therefore build in
+time proportional to the number of distinct shapes, not of instances.
+"""
+from manim import *
+
+from common.text_cache import cached_text
+
+# video #11 look : rounded boxes, thin strokes, pastel labels
+HOLY = {
+    "name": "holy",
+    "rounded": True,
+    "unit_width": 3,
+    "label_color": "#FFF2EF",
+    "stroke_width": 1.5,
+    "mux_points": [[-0.25, 0.4, 0], [0.0, 0.25, 0], [0.0, -0.25, 0], [-0.25, -0.4, 0]],
+    "mux_label_centered": True,
+}
+
+# video #9 look : plain rectangles, default strokes, white labels
+CLASSIC = {
+    "name": "classic",
+    "rounded": False,
+    "unit_width": 2,
+    "label_color": WHITE,
+    "stroke_width": None,
+    "mux_points": [[-0.25, 0.4, 0], [0.15, 0.2, 0], [0.15, -0.2, 0], [-0.25, -0.4, 0]],
+    "mux_label_centered": False,
+}
+
+_prototypes = {}
+stats = {"prototypes": 0, "instances": 0}
+
+
+def _instance(key: tuple, build):
+    proto = _prototypes.get(key)
+    if proto is None:
+        proto = _prototypes[key] = build()
+        stats["prototypes"] += 1
+    stats["instances"] += 1
+    return proto.copy()
+
+
+def _stroke(style) -> dict:
+    return {} if style["stroke_width"] is None else {"stroke_width": style["stroke_width"]}
+
+
+def _logic_unit(size, color, inputs, outputs, clock, title, inverted, style) -> VGroup:
+    if not inverted:
+        w, h = style["unit_width"]*size, 5*size
+    else:
+        h, w = 2*size, 5*size
+
+    if style["rounded"]:
+        box = RoundedRectangle(width=w, height=h, color=color, fill_color=color, fill_opacity=0.2,
+                               corner_radius=w*0.1, **_stroke(style))
+    else:
+        box = Rectangle(width=w, height=h, color=color, fill_color=color, fill_opacity=0.2, **_stroke(style))
+
+    vg = VGroup()
+    vg.add(box)
+
+    label = lambda s: cached_text(s, font_size=8, color=style["label_color"])
+    n_in, n_out = len(inputs), len(outputs)
+
+    for i, input in enumerate(inputs):
+        text = label(input)
+        text.next_to(box, LEFT, buff=-(text.width+0.1))
+        text.shift([0, (h/2)-((i+1)*(h/(n_in+1))), 0])
+        vg.add(text)
+
+    for i, output in enumerate(outputs):
+        text = label(output)
+        text.next_to(box, RIGHT, buff=-(text.width+0.1))
+        text.shift([0, (h/2)-((i+1)*(h/(n_out+1))), 0])
+        vg.add(text)
+
+    if clock:
+        text = label("clock")
+        text.shift([-text.width/2, 0, 0])
+        text.next_to(box, UP, buff=-(text.height+0.1))
+        vg.add(text)
+
+    if not title == "":
+        text = label(title)
+        text.next_to(box, DOWN)
+        text.shift([0, 0.5, 0])
+        vg.add(text)
+
+    vg.move_to(ORIGIN)
+    return vg
+
+
+def create_logic_unit(size: float, position: list, color: ManimColor, inputs: list, outputs: list, clock: bool = False, title: str = "", inverted=False, style=HOLY) -> VGroup:
+    """creates a logical unit with I/Os"""
+    key = ("logic", size, ManimColor(color).to_hex(), tuple(inputs), tuple(outputs), clock, title, inverted, style["name"])
+    unit = _instance(key, lambda: _logic_unit(size, color, inputs, outputs, clock, title, inverted, style))
+    return unit.move_to(position)
+
+
+def _alu(size, color, title) -> VGroup:
+    points = [
+        [0, 0, 0],
+        [0, -0.4 * size, 0],
+        [0.1 * size, -0.5 * size, 0],
+        [0, -0.6 * size, 0],
+        [0, -1 * size, 0],
+        [0.35 * size, -0.8 * size, 0],
+        [0.35 * size, -0.2 * size, 0],
+        [0, 0, 0],  # close the polygon
+    ]
+
+    alu = Polygon(*points, color=color, fill_opacity=0.2, fill_color=color, stroke_width=1.5)
+    vg = VGroup(alu)
+
+    title_text = cached_text(title, font_size=size*12, rotation=PI / 2)
+
+    # Center the text inside the polygon
+    title_text.move_to(alu.get_center()+[0.025*size,0,0])
+    vg.add(title_text)
+
+    vg.move_to(ORIGIN)
+    return vg
+
+
+def create_alu(size: float, position: list, color: ManimColor, title: str = "") -> VGroup:
+    """creates an ALU / adder shape with its title"""
+    key = ("alu", size, ManimColor(color).to_hex(), title)
+    return _instance(key, lambda: _alu(size, color, title)).move_to(position)
+
+
+def _mux(color, size, style) -> VGroup:
+    scaled_points = [[x * size, y * size, z * size] for x, y, z in style["mux_points"]]
+    mux_shape = Polygon(*scaled_points, fill_color=color, fill_opacity=0.2, color=color, **_stroke(style))
+    mux_label = cached_text("MUX", font_size=8 * size, rotation=PI / 2)
+    if style["mux_label_centered"]:
+        mux_label.move_to(mux_shape.get_center())
+    else:
+        mux_label.next_to(mux_shape.get_center()).shift([-0.25, 0, 0])
+    return VGroup(mux_shape, mux_label)
+
+
+def create_mux(position: list, color: ManimColor, size: float = 1.0, style=HOLY) -> VGroup:
+    """creates a MUX, `position` is where the shape's origin lands"""
+    key = ("mux", size, ManimColor(color).to_hex(), style["name"])
+    return _instance(key, lambda: _mux(color, size, style)).shift(position)
@@ -0,0 +1,81 @@
+"""
+Fixed-width hex values ("0x0000002C") made of one glyph per character.
+
+The glyphs come from a single template text laid out once per font / size /
+color, "0123456789ABCDEFx0": in a fixed-width font the last "0" gives the
+advance, and every glyph its offset within its cell. Changing the value swaps
+only the glyphs of the digits that differ (a copy of a template glyph, no text
+layout), so both building and morphing scale with the changed nibbles: pc + 4
+usually touches one digit out of eight.
+"""
+import numpy as np
+from manim import VGroup, Transform, ORIGIN, OUT, WHITE, rotation_matrix
+
+from common.text_cache import cached_text
+
+CHARSET = "0123456789ABCDEFx"
+
+_templates = {}
+
+
+def _template(font: str, font_size: float, color) -> tuple:
+    """(glyphs centered on the origin by character, offset of each glyph in its cell, advance)"""
+    key = (font, float(font_size), str(color))
+    if key not in _templates:
+        text = cached_text(CHARSET + "0", font=font, font_size=font_size, color=color)
+        centers = np.array([glyph.get_center() for glyph in text])
+        advance = (centers[-1] - centers[0]) / len(CHARSET)
+        glyphs, offsets = {}, {}
+        for k, char in enumerate(CHARSET):
+            glyphs[char] = text[k].copy().move_to(ORIGIN)
+            # where the glyph sits relative to a "0" in the same cell
+            offsets[char] = centers[k] - centers[0] - k * advance
+        _templates[key] = (glyphs, offsets, advance)
+    return _templates[key]
+
+
+class HexValue(VGroup):
+    """`prefix` + `digits` hex digits, one glyph per character, rotated by `rotation`"""
+
+    def __init__(self, value: int = 0, digits: int = 8, prefix: str = "0x", font: str = "",
+                 font_size: float = 8, color=WHITE, rotation: float = 0.0):
+        super().__init__()
+        self.glyphs, self.offsets, advance = _template(font, font_size, color)
+        self.digits = digits
+        self.rotation = rotation_matrix(rotation, OUT)
+        self.angle = rotation
+        self.chars = list(prefix + self.format(value))
+        for k, char in enumerate(self.chars):
+            self.add(self.glyph(char, self.rotation @ (k * advance)))
+        self.prefix = len(prefix)
+        self.value = int(value) & ((1 << 4 * digits) - 1)
+
+    def format(self, value: int) -> str:
+        return f"{int(value) & ((1 << 4 * self.digits) - 1):0{self.digits}X}"
+
+    def glyph(self, char: str, cell) -> VGroup:
+        """glyph of `char` for the cell whose "0" would be centered on `cell`"""
+        glyph = self.glyphs[char].copy()
+        if self.angle:
+            glyph.rotate(self.angle, about_point=ORIGIN)
+        return glyph.move_to(cell + self.rotation @ self.offsets[char])
+
+    def set_value(self, value: int, animate: bool = True) -> list:
+        """
+        shows `value`, swapping only the digits that differ.
+        Returns their Transforms to play when animated, else snaps them
+        """
+        updates = []
+        for k, char in enumerate(self.format(value), start=self.prefix):
+            if char == self.chars[k]:
+                continue
+            current = self[k]
+            cell = current.get_center() - self.rotation @ self.offsets[self.chars[k]]
+            target = self.glyph(char, cell)
+            if animate:
+                updates.append(Transform(current, target))
+            else:
+                current.become(target)
+            self.chars[k] = char
+        self.value = int(value) & ((1 << 4 * self.digits) - 1)
+        return updates
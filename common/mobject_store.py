@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+from manim import VGroup, VMobject, ManimColor
+
+from common.cache import save_npz_atomic
+
+# A VMobject family is flattened into a few arrays:
+#   points  : every point of every node, concatenated
+#   offsets : where each node's points start/stop in `points`
+#   fill    : one rgba per node
+#   stroke  : one rgba + width per node
+#   tree    : json nesting of node indices, so VGroup structure survives the round trip
+
+
+def dump_vmobject(mob: VMobject) -> dict:
+    """flattens a VMobject family into plain numpy arrays"""
+    points, fills, strokes, offsets = [], [], [], [0]
+
+    def visit(m):
+        idx = len(fills)
+        points.append(np.asarray(m.points, dtype=np.float64).reshape(-1, 3))
+        offsets.append(offsets[-1] + len(points[-1]))
+        fills.append(m.get_fill_rgbas()[0])
+        strokes.append([*m.get_stroke_rgbas()[0], m.get_stroke_width()])
+        return [idx, [visit(sub) for sub in m.submobjects]]
+
+    tree = visit(mob)
+    return {
+        "points": np.concatenate(points) if points else np.zeros((0, 3)),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "fill": np.asarray(fills, dtype=np.float64),
+        "stroke": np.asarray(strokes, dtype=np.float64),
+        "tree": np.array(json.dumps(tree)),
+    }
+
+
+def load_vmobject(data) -> VMobject:
+    """rebuilds what `dump_vmobject` produced (leaves are VMobjects, inner nodes VGroups)"""
+    points, offsets = data["points"], data["offsets"]
+    fill, stroke = data["fill"], data["stroke"]
+
+    def build(node):
+        idx, children = node
+        m = VGroup() if children else VMobject()
+        m.points = points[offsets[idx]:offsets[idx + 1]].copy()
+        m.set_fill(ManimColor(fill[idx][:3]), opacity=fill[idx][3], family=False)
+        m.set_stroke(ManimColor(stroke[idx][:3]), width=stroke[idx][4], opacity=stroke[idx][3], family=False)
+        for child in children:
+            m.add(build(child))
+        return m
+
+    return build(json.loads(str(data["tree"])))
+
+
+def save_vmobjects(path, mobjects: dict):
+    """stores several named VMobject families in one .npz"""
+    arrays = {}
+    for name, mob in mobjects.items():
+        for field, value in dump_vmobject(mob).items():
+            arrays[f"{name}|{field}"] = value
+    save_npz_atomic(path, **arrays)
+
+
+def load_vmobjects(path) -> dict:
+    """inverse of `save_vmobjects`"""
+    fields = {}
+    with np.load(path) as data:
+        for key in data.files:
+            name, field = key.rsplit("|", 1)
+            fields.setdefault(name, {})[field] = data[key]
+    return {name: load_vmobject(arrays) for name, arrays in fields.items()}
@@ -0,0 +1,62 @@
+import os
+from collections import OrderedDict
+
+import manim
+import numpy as np
+from manim import Text, ManimColor, WHITE
+
+from common.cache import cache_dir, content_key, save_npz_atomic
+from common.mobject_store import dump_vmobject, load_vmobject
+
+# Text() goes through pango + svg parsing every time, which dominates renders
+# that show the same few hex strings over and over. Glyph outlines are cached
+# in memory (LRU) and on disk, keyed on everything that changes the outline.
+
+MAX_ENTRIES = int(os.environ.get("BRH_TEXT_CACHE_SIZE", 4096))
+DISK_CACHE = os.environ.get("BRH_TEXT_DISK_CACHE", "1") != "0"
+
+_memory = OrderedDict()
+stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def text_key(text: str, font: str = "", font_size: float = 8, color=WHITE, rotation: float = 0.0) -> str:
+    return content_key(manim.__version__, text, font, float(font_size),
+                       ManimColor(color).to_hex(), round(float(rotation), 6))
+
+
+def _build(text, font, font_size, color, rotation):
+    mob = Text(text, font=font, font_size=font_size, color=ManimColor(color))
+    if rotation:
+        mob.rotate(rotation)
+    return mob
+
+
+def cached_text(text: str, font: str = "", font_size: float = 8, color=WHITE, rotation: float = 0.0):
+    """same as Text(...).rotate(rotation), but laid out once per distinct key; returns a fresh copy"""
+    key = text_key(text, font, font_size, color, rotation)
+
+    mob = _memory.get(key)
+    if mob is not None:
+        _memory.move_to_end(key)
+        stats["hits"] += 1
+        return mob.copy()
+
+    path = cache_dir("text") / f"{key}.npz" if DISK_CACHE else None
+    if path is not None and path.exists():
+        with np.load(path) as data:
+            mob = load_vmobject(data)
+        stats["disk_hits"] += 1
+    else:
+        mob = _build(text, font, font_size, color, rotation)
+        stats["misses"] += 1
+        if path is not None:
+            save_npz_atomic(path, **dump_vmobject(mob))
+
+    _memory[key] = mob
+    if len(_memory) > MAX_ENTRIES:
+        _memory.popitem(last=False)
+    return mob.copy()
+
+
+def clear_memory():
+    _memory.clear()